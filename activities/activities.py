@@ -1,14 +1,26 @@
+import asyncio
 import inspect
 import json
 import os
-from datetime import datetime
-from typing import Sequence
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
 
+import litellm
 from dotenv import load_dotenv
-from litellm import completion
 from temporalio import activity
 from temporalio.common import RawValue
 
+from activities import llm_metrics
+from activities.json_repair import parse_json_tolerant
+from activities.llm_cache import LLMResponseCache
+from activities.llm_client import LLMBackend, LLMClient
+from activities.llm_routing import LLMRoute, load_llm_routes
+from activities.prompt_prefilter import is_trivially_valid, normalize
+from activities.structured_output import (
+    detect_structured_output_mode,
+    response_format,
+)
 from models.requests import (
     EnvLookupInput,
     EnvLookupOutput,
@@ -16,61 +28,167 @@ from models.requests import (
     ValidationInput,
     ValidationResult,
 )
+from prompts.history_window import window_conversation_history
+from shared.http_pool import get_http_pool
+from shared.tracing import set_span_attributes
 
 load_dotenv(override=True)
 
+# How often the planner heartbeats while waiting on the LLM; a cancelled
+# activity only learns of it from a heartbeat response
+PLANNER_HEARTBEAT_INTERVAL_SECONDS = 1.0
+
 
 class AgentActivities:
     def __init__(self):
         """Initialize LLM client using LiteLLM."""
         self.llm_model = os.environ.get("LLM_MODEL", "openai/gpt-4")
-        self.llm_key = os.environ.get("LLM_KEY")
         self.llm_base_url = os.environ.get("LLM_BASE_URL")
+        # Validation and summaries can run on a cheaper, faster model than planning
+        self.llm_routes = load_llm_routes()
+        # Hedges slow calls and fails over across LLM_FALLBACK_BACKENDS
+        self.llm_client = LLMClient.from_env()
+        # LiteLLM sends requests over the worker's pooled keep-alive connections
+        self.http_pool = get_http_pool()
+        litellm.aclient_session = self.http_pool.async_client
+        # In-flight LLM backend calls per worker, hedges included (see LLMClient)
+        self.llm_max_concurrency = self.llm_client.max_concurrency
+        self.llm_cache: Optional[LLMResponseCache] = None
+        if os.environ.get("LLM_CACHE_ENABLED", "true").lower() == "true":
+            self.llm_cache = LLMResponseCache(
+                max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "1024")),
+                ttl_seconds=float(os.environ.get("LLM_CACHE_TTL_SECONDS", "3600")),
+                db_path=os.environ.get("LLM_CACHE_PATH"),
+                max_db_entries=int(
+                    os.environ.get("LLM_CACHE_MAX_DB_ENTRIES", "100000")
+                ),
+            )
         activity.logger.info(
             f"Initializing AgentActivities with LLM model: {self.llm_model}"
         )
         if self.llm_base_url:
             activity.logger.info(f"Using custom base URL: {self.llm_base_url}")
+        # model -> structured output mode, detected on first use
+        self.structured_output_modes: Dict[str, str] = {}
+        for call_site, route in self.llm_routes.items():
+            activity.logger.info(
+                f"LLM route for {call_site}: {route.model} "
+                f"(structured output: {self.structured_output_mode(route.model)})"
+            )
+        # Responses that needed repair or could not be parsed at all
+        self.parse_attempts = 0
+        self.parse_repairs = 0
+        self.parse_failures = 0
+        # Validations answered locally without an LLM call, for the bypass rate
+        self.validations = 0
+        self.validations_bypassed = 0
+        # ((catalog path, mtime), normalized city names) for the validation prefilter
+        self._known_places: Tuple[Optional[Tuple[str, int]], FrozenSet[str]] = (
+            None,
+            frozenset(),
+        )
 
     @activity.defn
     async def agent_toolPlanner(self, input: ToolPromptInput) -> dict:
-        messages = [
-            {
-                "role": "system",
-                "content": input.context_instructions
-                + ". The current date is "
-                + datetime.now().strftime("%B %d, %Y"),
-            },
-            {
-                "role": "user",
-                "content": input.prompt,
-            },
-        ]
+        current_date = ". The current date is " + datetime.now().strftime("%B %d, %Y")
+        route = self.llm_routes[input.call_site]
+        metric_attributes = {"call_site": input.call_site, "model": route.model}
+        set_span_attributes(
+            {"agent.call_site": input.call_site, "gen_ai.request.model": route.model}
+        )
+
+        # Fallback backends may run another provider's model; rebuild the request for it
+        def request_for(model: str) -> Dict[str, Any]:
+            return self.completion_kwargs(route, model, input, current_date)
 
         try:
-            completion_kwargs = {
-                "model": self.llm_model,
-                "messages": messages,
-                "api_key": self.llm_key,
-            }
+            completion_kwargs = request_for(route.model)
 
-            # Add base_url if configured
-            if self.llm_base_url:
-                completion_kwargs["base_url"] = self.llm_base_url
+            cache_key = None
+            if self.llm_cache is not None:
+                cache_key = self.llm_cache.make_key(completion_kwargs)
+                cached = await self.llm_cache.get(cache_key)
+                if cached is not None:
+                    activity.logger.info(
+                        f"LLM cache hit ({self.llm_cache.stats()}): {cached}"
+                    )
+                    llm_metrics.record_request(metric_attributes, "cache_hit")
+                    set_span_attributes({"agent.llm_cache_hit": True})
+                    return cached
 
-            response = completion(**completion_kwargs)
+            # The client awaits acompletion, keeping the worker's event loop free;
+            # it also caps concurrent backend calls at LLM_MAX_CONCURRENCY
+            started_at = time.monotonic()
+            answered_by: List[LLMBackend] = []
+            heartbeats = asyncio.create_task(self.heartbeat_while_running())
+            try:
+                response = await self.llm_client.complete(
+                    route,
+                    completion_kwargs,
+                    request_for,
+                    on_queue_wait=lambda seconds: llm_metrics.record_queue_wait(
+                        metric_attributes, timedelta(seconds=seconds)
+                    ),
+                    on_answer=answered_by.append,
+                )
+            finally:
+                heartbeats.cancel()
+            # A hedge or fallback may have answered instead of the route's model
+            llm_metrics.record_completion(
+                dict(
+                    metric_attributes,
+                    model=answered_by[0].model,
+                    backend=answered_by[0].name,
+                ),
+                timedelta(seconds=time.monotonic() - started_at),
+                response,
+            )
+            llm_metrics.record_http_pool(self.http_pool.stats())
+            prompt_tokens, cached_tokens, completion_tokens = llm_metrics.token_usage(
+                response
+            )
+            set_span_attributes(
+                {
+                    "agent.llm_cache_hit": False,
+                    "gen_ai.response.model": getattr(response, "model", None),
+                    "gen_ai.usage.input_tokens": prompt_tokens,
+                    "gen_ai.usage.cached_input_tokens": cached_tokens,
+                    "gen_ai.usage.output_tokens": completion_tokens,
+                }
+            )
 
             response_content = response.choices[0].message.content
             activity.logger.info(f"LLM response: {response_content}")
+            self.log_token_usage(response)
+            activity.logger.debug(f"HTTP pool: {self.http_pool.stats()}")
 
             # Use the new sanitize function
             response_content = self.sanitize_json_response(response_content)
 
-            return self.parse_json_response(response_content)
+            result = self.parse_json_response(response_content, metric_attributes)
+            # Only cache responses that parsed, so a retry can get a better answer
+            if cache_key is not None:
+                await self.llm_cache.set(cache_key, result)
+            llm_metrics.record_request(metric_attributes, "ok")
+            return result
         except Exception as e:
-            activity.logger.error(f"Error in LLM completion: {str(e)}")
+            llm_metrics.record_request(metric_attributes, "error")
+            activity.logger.error(
+                f"Error in LLM completion: {str(e)} "
+                f"(backends: {self.llm_client.stats()['backends']})"
+            )
             raise
 
+    async def heartbeat_while_running(self) -> None:
+        """
+        Heartbeats until cancelled. When the workflow cancels the activity (e.g. a
+        discarded speculative plan), the heartbeat response delivers it and the
+        LLM call in flight is cancelled.
+        """
+        while True:
+            activity.heartbeat()
+            await asyncio.sleep(PLANNER_HEARTBEAT_INTERVAL_SECONDS)
+
     @activity.defn
     async def agent_validatePrompt(
         self, validation_input: ValidationInput
@@ -79,26 +197,54 @@ class AgentActivities:
         Validates the prompt in the context of the conversation history and agent goal.
         Returns a ValidationResult indicating if the prompt makes sense given the context.
         """
+        self.validations += 1
+        bypass_reason = is_trivially_valid(
+            validation_input.prompt,
+            validation_input.conversation_history,
+            validation_input.agent_goal,
+            # Reading the catalog blocks, so it happens off the event loop
+            await asyncio.to_thread(self.known_places),
+        )
+        llm_metrics.record_validation(bypassed=bypass_reason is not None)
+        if bypass_reason is not None:
+            self.validations_bypassed += 1
+            activity.logger.info(
+                f"Prompt accepted without LLM validation ({bypass_reason}); "
+                f"bypass rate {self.validations_bypassed}/{self.validations}"
+            )
+            return ValidationResult(validationResult=True)
+
         # Create simple context string describing tools and goals
         tools_description = []
         for tool in validation_input.agent_goal.tools:
             tool_str = f"Tool: {tool.name}\n"
             tool_str += f"Description: {tool.description}\n"
             tool_str += "Arguments: " + ", ".join(
-                [f"{arg.name} ({arg.type})" for arg in tool.arguments]
+                [
+                    f"{arg.name} ({arg.type}{'' if arg.required else ', optional'})"
+                    for arg in tool.arguments
+                ]
             )
             tools_description.append(tool_str)
         tools_str = "\n".join(tools_description)
 
-        # Convert conversation history to string
-        history_str = json.dumps(validation_input.conversation_history, indent=2)
+        # Convert conversation history to string, fitting it to the validation model's budget
+        history, tokens_saved = window_conversation_history(
+            validation_input.conversation_history,
+            self.llm_routes["validate"].history_token_budget,
+        )
+        if tokens_saved:
+            activity.logger.info(
+                f"Windowed validation history, saved ~{tokens_saved} tokens"
+            )
+        history_str = json.dumps(history, indent=2)
 
-        # Create context instructions
+        # Create context instructions; the goal and tools are static per goal and go first
         context_instructions = f"""The agent goal and tools are as follows:
             Description: {validation_input.agent_goal.description}
             Available Tools:
-            {tools_str}
-            The conversation history to date is:
+            {tools_str}"""
+        dynamic_context = f"""The conversation history to date is:
             {history_str}"""
 
         # Create validation prompt
@@ -122,7 +268,10 @@ class AgentActivities:
 
         # Call the LLM with the validation prompt
         prompt_input = ToolPromptInput(
-            prompt=validation_prompt, context_instructions=context_instructions
+            prompt=validation_prompt,
+            context_instructions=context_instructions,
+            dynamic_context=dynamic_context,
+            call_site="validate",
         )
 
         result = await self.agent_toolPlanner(prompt_input)
@@ -132,6 +281,26 @@ class AgentActivities:
             validationFailedReason=result.get("validationFailedReason", {}),
         )
 
+    def known_places(self) -> FrozenSet[str]:
+        """
+        Normalized city names from the event catalog, reloaded when the catalog
+        file changes. Any failure to read it means no known places, so prompts
+        naming a place go to LLM validation.
+        """
+        from tools.event_store import get_event_store
+
+        try:
+            store = get_event_store()
+            version = (str(store.path), os.stat(store.path).st_mtime_ns)
+            cached_version, places = self._known_places
+            if version != cached_version:
+                places = frozenset(normalize(city) for city in store.city_names())
+                self._known_places = (version, places)
+            return places
+        except Exception as e:
+            activity.logger.warning(f"Could not read the event catalog's cities: {e}")
+            return frozenset()
+
     @activity.defn
     async def get_wf_env_vars(self, input: EnvLookupInput) -> EnvLookupOutput:
         """gets env vars for workflow as an activity result so it's deterministic
@@ -148,8 +317,108 @@ class AgentActivities:
         else:
             output.show_confirm = True
 
+        speculative_planning_value = os.getenv(input.speculative_planning_env_var_name)
+        if speculative_planning_value is None:
+            output.speculative_planning = input.speculative_planning_default
+        else:
+            output.speculative_planning = speculative_planning_value.lower() == "true"
+
+        output.history_token_budget = self.llm_routes["plan"].history_token_budget
+
         return output
 
+    def completion_kwargs(
+        self, route: LLMRoute, model: str, input: ToolPromptInput, current_date: str
+    ) -> Dict[str, Any]:
+        """
+        The completion request for input on model, which is the route's own model or
+        a fallback backend's. Prompt cache markers and response_format depend on
+        the model, so each backend gets its own.
+        """
+        if input.dynamic_context is None:
+            messages = [
+                {
+                    "role": "system",
+                    "content": input.context_instructions + current_date,
+                },
+            ]
+        else:
+            # Static prefix first and on its own, so the provider can cache it
+            messages = [
+                {
+                    "role": "system",
+                    "content": self.cacheable_content(
+                        model, input.context_instructions
+                    ),
+                },
+                {
+                    "role": "system",
+                    "content": input.dynamic_context + current_date,
+                },
+            ]
+        messages.append(
+            {
+                "role": "user",
+                "content": input.prompt,
+            }
+        )
+
+        completion_kwargs = {
+            "model": model,
+            "messages": messages,
+            "api_key": route.api_key,
+        }
+
+        # Add base_url, timeout and max_tokens if configured
+        if route.base_url:
+            completion_kwargs["base_url"] = route.base_url
+        if route.timeout:
+            completion_kwargs["timeout"] = route.timeout
+        if route.max_tokens:
+            completion_kwargs["max_tokens"] = route.max_tokens
+
+        request_format = response_format(
+            self.structured_output_mode(model), input.tool_data_response, messages
+        )
+        if request_format is not None:
+            completion_kwargs["response_format"] = request_format
+        return completion_kwargs
+
+    def structured_output_mode(self, model: str) -> str:
+        """The structured output mode for model, detected once per model."""
+        if model not in self.structured_output_modes:
+            self.structured_output_modes[model] = detect_structured_output_mode(model)
+        return self.structured_output_modes[model]
+
+    def cacheable_content(
+        self, model: str, text: str
+    ) -> Union[str, List[Dict[str, Any]]]:
+        """
+        Marks a static prompt prefix as cacheable. OpenAI-compatible providers cache
+        long stable prefixes automatically; Anthropic needs an explicit breakpoint.
+        """
+        if model.startswith("anthropic/"):
+            return [
+                {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+            ]
+        return text
+
+    def log_token_usage(self, response: Any) -> None:
+        """
+        Logs prompt tokens split into those served from the provider's prompt cache
+        and those processed from scratch.
+        """
+        if getattr(response, "usage", None) is None:
+            return
+        prompt_tokens, cached_tokens, completion_tokens = llm_metrics.token_usage(
+            response
+        )
+        activity.logger.info(
+            f"LLM token usage: prompt={prompt_tokens} "
+            f"(cached={cached_tokens}, uncached={prompt_tokens - cached_tokens}), "
+            f"completion={completion_tokens}"
+        )
+
     def sanitize_json_response(self, response_content: str) -> str:
         """
         Sanitizes the response content to ensure it's valid JSON.
@@ -162,16 +431,33 @@ class AgentActivities:
 
         return response_content
 
-    def parse_json_response(self, response_content: str) -> dict:
+    def parse_json_response(
+        self, response_content: str, metric_attributes: Dict[str, str]
+    ) -> dict:
         """
         Parses the JSON response content and returns it as a dictionary.
+        Stray text around the object and common defects are repaired in-process,
+        since failing here costs a full activity retry.
         """
+        self.parse_attempts += 1
         try:
-            data = json.loads(response_content)
-            return data
+            data, repaired = parse_json_tolerant(response_content)
         except json.JSONDecodeError as e:
-            activity.logger.error(f"Invalid JSON: {e}")
+            self.parse_failures += 1
+            llm_metrics.record_parse(metric_attributes, "failed")
+            activity.logger.error(
+                f"Invalid JSON: {e} "
+                f"(parse failures {self.parse_failures}/{self.parse_attempts})"
+            )
             raise
+        llm_metrics.record_parse(metric_attributes, "repaired" if repaired else "ok")
+        if repaired:
+            self.parse_repairs += 1
+            activity.logger.warning(
+                f"Repaired malformed JSON response "
+                f"(repairs {self.parse_repairs}/{self.parse_attempts})"
+            )
+        return data
 
 
 @activity.defn(dynamic=True)
@@ -181,13 +467,18 @@ async def dynamic_tool_activity(args: Sequence[RawValue]) -> dict:
     tool_name = activity.info().activity_type  # e.g. "FindEvents"
     tool_args = activity.payload_converter().from_payload(args[0].payload, dict)
     activity.logger.info(f"Running dynamic tool '{tool_name}' with args: {tool_args}")
+    set_span_attributes({"agent.tool": tool_name})
 
     # Delegate to the relevant function
     handler = get_handler(tool_name)
     if inspect.iscoroutinefunction(handler):
         result = await handler(tool_args)
     else:
-        result = handler(tool_args)
+        # Blocking tools run in a thread so they don't stall the event loop
+        result = await asyncio.to_thread(handler, tool_args)
+
+    # Tools such as SearchFlights call out over the shared pool
+    llm_metrics.record_http_pool(get_http_pool().stats())
 
     # Optionally log or augment the result
     activity.logger.info(f"Tool '{tool_name}' result: {result}")
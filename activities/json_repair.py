@@ -0,0 +1,123 @@
+import ast
+import json
+import re
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _object_at(text: str, start: int) -> Tuple[str, Optional[int]]:
+    """
+    The balanced {...} object starting at text[start], ignoring braces inside
+    strings, and the index just past it. If the text ends before the object
+    closes (e.g. a truncated response), the missing closing braces and brackets
+    are appended and the index is None.
+    """
+    closers = []
+    in_string = False
+    quote = ""
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                in_string = False
+        elif char in ('"', "'"):
+            in_string = True
+            quote = char
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if closers:
+                closers.pop()
+            if not closers:
+                return text[start : index + 1], index + 1
+
+    candidate = text[start:]
+    if in_string:
+        candidate += quote
+    return candidate + "".join(reversed(closers)), None
+
+
+def json_object_candidates(text: str) -> Iterator[str]:
+    """
+    The {...} objects in text, in order, for trying one after another when prose
+    before the JSON contains braces too, e.g. "I can't do {that}. {...}".
+    After a closed object the search resumes past it, so objects nested inside
+    it are not offered on their own; after an unclosed one, at the next brace.
+    """
+    start = text.find("{")
+    while start != -1:
+        candidate, end = _object_at(text, start)
+        yield candidate
+        start = text.find("{", end if end is not None else start + 1)
+
+
+def extract_json_object(text: str) -> Optional[str]:
+    """
+    Returns the first balanced {...} object in text, ignoring braces inside strings.
+    If the text ends before the object closes (e.g. a truncated response), the
+    missing closing braces and brackets are appended.
+    """
+    return next(json_object_candidates(text), None)
+
+
+def _replace_python_literals(text: str) -> str:
+    """Swap True/False/None for JSON literals, leaving string contents alone."""
+    parts = re.split(r'("(?:\\.|[^"\\])*")', text)
+    for i in range(0, len(parts), 2):  # even indexes are outside strings
+        parts[i] = re.sub(
+            r"\b(True|False|None)\b", lambda m: _PYTHON_LITERALS[m.group(1)], parts[i]
+        )
+    return "".join(parts)
+
+
+def parse_json_tolerant(text: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Parses the first usable JSON object in an LLM response, repairing common defects:
+    surrounding prose, smart quotes, trailing commas, Python-style literals and
+    single-quoted keys/strings, and truncated closing braces.
+
+    Returns the parsed object and whether any repair was needed.
+    Raises json.JSONDecodeError if no object can be recovered.
+    """
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return data, False
+    except json.JSONDecodeError:
+        pass
+
+    error: Optional[json.JSONDecodeError] = None
+    for candidate in json_object_candidates(text.translate(_SMART_QUOTES)):
+        try:
+            return _repair(candidate), True
+        except json.JSONDecodeError as e:
+            error = error or e  # the first object's error is the most telling
+    if error is None:
+        raise json.JSONDecodeError("No JSON object found", text, 0)
+    raise error
+
+
+def _repair(candidate: str) -> Dict[str, Any]:
+    """Parses one extracted object, repairing it if needed."""
+    candidate = _TRAILING_COMMA.sub(r"\1", candidate)
+    try:
+        return json.loads(_replace_python_literals(candidate))
+    except json.JSONDecodeError as e:
+        error = e
+
+    # Python dict syntax, e.g. {'next': 'question', 'args': {'city': None}}
+    try:
+        data = ast.literal_eval(candidate)
+        if isinstance(data, dict):
+            return json.loads(json.dumps(data))
+    except (ValueError, SyntaxError, TypeError):
+        pass
+    raise error
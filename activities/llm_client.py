@@ -0,0 +1,360 @@
+import asyncio
+import json
+import os
+import random
+import time
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import litellm
+from litellm import acompletion
+
+from activities import llm_metrics
+from activities.llm_routing import LLMRoute
+
+CompletionFn = Callable[..., Awaitable[Any]]
+# Builds the completion kwargs for a model, e.g. its response_format and cache markers
+RequestFn = Callable[[str], Dict[str, Any]]
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, float("inf"))
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    """
+    Whether an error says the backend is unhealthy: timeouts, connection errors,
+    rate limits (429) and server errors (5xx). Other errors, e.g. a 400 for a
+    malformed request, are the request's fault and don't count towards the
+    circuit breaker.
+    """
+    if isinstance(
+        error,
+        (
+            litellm.Timeout,
+            litellm.APIConnectionError,
+            litellm.RateLimitError,
+            asyncio.TimeoutError,
+            TimeoutError,
+            ConnectionError,
+        ),
+    ):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+
+@dataclass
+class LLMBackend:
+    """One place an LLM request can be sent: a model, optionally at a custom endpoint."""
+
+    model: str
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+    completion: CompletionFn = acompletion
+
+    @property
+    def name(self) -> str:
+        return f"{self.model}@{self.base_url}" if self.base_url else self.model
+
+
+@dataclass
+class BackendHealth:
+    """Latency samples and circuit breaker state for one backend."""
+
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=200))
+    histogram: List[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    consecutive_failures: int = 0
+    open_until: float = 0.0  # circuit is open (backend skipped) until this time
+    probing: bool = False  # the half-open circuit's one trial request is in flight
+    requests: int = 0
+    failures: int = 0
+
+    def record_success(self, latency: float) -> None:
+        self.requests += 1
+        self.samples.append(latency)
+        self.histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def record_failure(self, threshold: int, cooldown: float) -> None:
+        self.requests += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.probing = False
+        if self.consecutive_failures >= threshold:
+            self.open_until = time.monotonic() + cooldown
+
+    def record_rejection(self) -> None:
+        """A request the backend answered with a client error; it is still up."""
+        self.requests += 1
+        self.probing = False
+
+    def available(self) -> bool:
+        if not self.open_until:
+            return True
+        # After the cooldown one trial request is let through (half-open); it
+        # closes or re-opens the circuit, and others skip the backend meanwhile
+        return time.monotonic() >= self.open_until and not self.probing
+
+    def start_request(self) -> bool:
+        """Note a request being sent; returns whether it is the half-open trial."""
+        if self.open_until and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class LLMClient:
+    """
+    Sends completion requests to an ordered list of backends.
+
+    The first available backend gets the request. If it has not answered by its
+    p95 latency, the same request is hedged to the next available backend and
+    the first answer wins. A backend that fails failure_threshold times in a row
+    (see is_backend_failure) is skipped for cooldown_seconds (circuit breaker). Every backend call, hedges
+    included, takes one of max_concurrency slots.
+    """
+
+    def __init__(
+        self,
+        fallbacks: Optional[List[LLMBackend]] = None,
+        hedge: bool = True,
+        default_hedge_delay: float = 10.0,
+        min_hedge_delay: float = 1.0,
+        min_samples: int = 20,
+        failure_threshold: int = 5,
+        cooldown_seconds: float = 30.0,
+        max_concurrency: int = 100,
+    ) -> None:
+        self.fallbacks = fallbacks or []
+        self.hedge = hedge
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.max_concurrency = max_concurrency
+        # Caps in-flight backend calls per worker; calls beyond this wait their turn
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.health: Dict[str, BackendHealth] = {}
+        self.hedged_requests = 0
+        self.hedge_wins = 0  # answers that came from a hedged request
+        self.failovers = (
+            0  # answers from a fallback after the primary was skipped or failed
+        )
+
+    @classmethod
+    def from_env(cls) -> "LLMClient":
+        """
+        LLM_FALLBACK_BACKENDS is a JSON list of backends tried after each route's own
+        model, e.g. [{"model": "anthropic/claude-3-5-haiku-latest"}].
+        """
+        fallbacks = [
+            LLMBackend(**backend)
+            for backend in json.loads(os.environ.get("LLM_FALLBACK_BACKENDS", "[]"))
+        ]
+        return cls(
+            fallbacks=fallbacks,
+            hedge=os.environ.get("LLM_HEDGE_ENABLED", "true").lower() == "true",
+            default_hedge_delay=float(os.environ.get("LLM_HEDGE_DEFAULT_DELAY", "10")),
+            failure_threshold=int(os.environ.get("LLM_CIRCUIT_FAILURE_THRESHOLD", "5")),
+            cooldown_seconds=float(
+                os.environ.get("LLM_CIRCUIT_COOLDOWN_SECONDS", "30")
+            ),
+            max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "100")),
+        )
+
+    def backends_for(self, route: LLMRoute) -> List[LLMBackend]:
+        """The route's own backend first, then the fallbacks in order."""
+        primary = LLMBackend(
+            model=route.model, api_key=route.api_key, base_url=route.base_url
+        )
+        # A fallback with the same name as the route's backend stands in for it
+        primary = next((b for b in self.fallbacks if b.name == primary.name), primary)
+        return [primary] + [b for b in self.fallbacks if b is not primary]
+
+    def health_of(self, backend: LLMBackend) -> BackendHealth:
+        return self.health.setdefault(backend.name, BackendHealth())
+
+    def hedge_delay(self, backend: LLMBackend) -> float:
+        health = self.health_of(backend)
+        if len(health.samples) < self.min_samples:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, health.percentile(95))
+
+    async def complete(
+        self,
+        route: LLMRoute,
+        completion_kwargs: Dict[str, Any],
+        request_for: Optional[RequestFn] = None,
+        on_queue_wait: Optional[Callable[[float], None]] = None,
+        on_answer: Optional[Callable[[LLMBackend], None]] = None,
+    ) -> Any:
+        """
+        Run a completion for the route, hedging and failing over across backends.
+        request_for, if given, rebuilds the kwargs for a fallback's model; otherwise
+        fallbacks get completion_kwargs with their own model and credentials.
+        on_queue_wait is told how long each backend call waited for a slot, and
+        on_answer which backend's response is returned.
+        """
+        backends = self.backends_for(route)
+        candidates = [b for b in backends if self.health_of(b).available()]
+        forced = not candidates
+        if forced:
+            # Every circuit is open; trying the primary beats failing outright
+            candidates = backends[:1]
+
+        # task -> (backend, whether it was launched as a hedge)
+        pending: Dict[asyncio.Task, Tuple[LLMBackend, bool]] = {}
+        last_error: Optional[BaseException] = None
+
+        def next_candidate() -> Optional[LLMBackend]:
+            # Availability can change while a request is in flight, e.g. another
+            # request takes a half-open backend's trial slot
+            while candidates:
+                backend = candidates.pop(0)
+                if forced or self.health_of(backend).available():
+                    return backend
+            return None
+
+        def launch(backend: LLMBackend, hedge: bool) -> None:
+            if request_for is not None and backend.model != completion_kwargs["model"]:
+                kwargs = request_for(backend.model)
+            else:
+                kwargs = completion_kwargs
+            # Taken now, before the task runs, so concurrent requests see it
+            trial = self.health_of(backend).start_request()
+            task = asyncio.create_task(
+                self._call(backend, kwargs, trial, on_queue_wait)
+            )
+            pending[task] = (backend, hedge)
+
+        try:
+            while True:
+                if not pending:
+                    backend = next_candidate()
+                    if backend is None:
+                        break
+                    launch(backend, hedge=False)
+
+                # Hedge to the next backend once the in-flight one runs past its p95
+                timeout = None
+                if self.hedge and candidates:
+                    first_backend, _ = next(iter(pending.values()))
+                    timeout = self.hedge_delay(first_backend)
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    backend = next_candidate()
+                    if backend is not None:
+                        self.hedged_requests += 1
+                        launch(backend, hedge=True)
+                    continue
+
+                for task in done:
+                    backend, hedge = pending.pop(task)
+                    if task.exception() is None:
+                        if hedge:
+                            self.hedge_wins += 1
+                        elif backend is not backends[0]:
+                            self.failovers += 1
+                        if on_answer is not None:
+                            on_answer(backend)
+                        return task.result()
+                    last_error = task.exception()
+                # Failed backends fall through to the next candidate
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error or RuntimeError("No LLM backend available")
+
+    async def _call(
+        self,
+        backend: LLMBackend,
+        completion_kwargs: Dict[str, Any],
+        trial: bool = False,
+        on_queue_wait: Optional[Callable[[float], None]] = None,
+    ) -> Any:
+        kwargs = dict(completion_kwargs, model=backend.model, api_key=backend.api_key)
+        kwargs.pop("base_url", None)
+        if backend.base_url:
+            kwargs["base_url"] = backend.base_url
+        health = self.health_of(backend)
+        start = queued_at = time.monotonic()
+        try:
+            async with self.semaphore:
+                start = time.monotonic()
+                if on_queue_wait is not None:
+                    on_queue_wait(start - queued_at)
+                response = await backend.completion(**kwargs)
+        except asyncio.CancelledError:
+            # Lost a hedge race; says nothing about the backend's health
+            if trial:
+                health.probing = False
+            raise
+        except Exception as e:
+            llm_metrics.record_backend_call(
+                backend.name, timedelta(seconds=time.monotonic() - start), "error"
+            )
+            if is_backend_failure(e):
+                health.record_failure(self.failure_threshold, self.cooldown_seconds)
+            else:
+                health.record_rejection()
+            raise
+        latency = time.monotonic() - start
+        health.record_success(latency)
+        llm_metrics.record_backend_call(backend.name, timedelta(seconds=latency), "ok")
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hedged_requests": self.hedged_requests,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "backends": {
+                name: {
+                    "requests": health.requests,
+                    "failures": health.failures,
+                    "p50": health.percentile(50),
+                    "p95": health.percentile(95),
+                    "circuit_open": not health.available(),
+                    "latency_histogram": dict(
+                        zip([f"le_{b}" for b in LATENCY_BUCKETS], health.histogram)
+                    ),
+                }
+                for name, health in self.health.items()
+            },
+        }
+
+
+def fake_backend(
+    model: str,
+    latency: float = 0.1,
+    failure_rate: float = 0.0,
+    content: str = '{"next": "question", "tool": null, "args": {}, "response": "Hi!"}',
+) -> LLMBackend:
+    """A local stand-in for an LLM provider, for exercising LLMClient offline."""
+
+    async def completion(**kwargs: Any) -> Any:
+        await asyncio.sleep(latency)
+        if random.random() < failure_rate:
+            raise ConnectionError(f"{model} failed")
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=None,
+        )
+
+    return LLMBackend(model=model, completion=completion)
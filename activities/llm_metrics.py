@@ -0,0 +1,104 @@
+from datetime import timedelta
+from typing import Any, Dict, Tuple
+
+from temporalio import activity
+
+# Recorded on the activity's metric meter, so they are exported by whatever
+# telemetry the worker's Temporal runtime is configured with (see worker/worker.py).
+# Every metric carries the call site (validate/plan/summarize) and route model;
+# latency and tokens carry the model and backend that answered instead.
+
+
+def token_usage(response: Any) -> Tuple[int, int, int]:
+    """
+    (prompt, cached prompt, completion) token counts of a LiteLLM response. Cached
+    tokens are those the provider served from its prompt cache.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return 0, 0, 0
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", 0) if details else 0) or 0
+    # Anthropic reports cache reads separately
+    cached_tokens = cached_tokens or getattr(usage, "cache_read_input_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    return prompt_tokens, cached_tokens, completion_tokens
+
+
+def record_request(attributes: Dict[str, str], outcome: str) -> None:
+    """Count an LLM request; outcome is "ok", "cache_hit" or "error"."""
+    activity.metric_meter().create_counter(
+        "agent_llm_requests", "LLM requests by outcome"
+    ).add(1, dict(attributes, outcome=outcome))
+
+
+def record_queue_wait(attributes: Dict[str, str], wait: timedelta) -> None:
+    activity.metric_meter().create_histogram_timedelta(
+        "agent_llm_queue_wait",
+        "Time an LLM request waited for a slot under LLM_MAX_CONCURRENCY",
+        "ms",
+    ).record(wait, attributes)
+
+
+def record_backend_call(backend: str, latency: timedelta, outcome: str) -> None:
+    """
+    Record one backend call's latency (hedges and failovers each count), tagged
+    with the backend rather than the call site. Outcome is "ok" or "error".
+    Not recorded outside an activity, e.g. when LLMClient runs in a script.
+    """
+    if not activity.in_activity():
+        return
+    activity.metric_meter().create_histogram_timedelta(
+        "agent_llm_backend_latency", "Latency of each call to an LLM backend", "ms"
+    ).record(latency, {"backend": backend, "outcome": outcome})
+
+
+def record_completion(
+    attributes: Dict[str, str], latency: timedelta, response: Any
+) -> None:
+    """Record the latency and token usage of a completed LLM call."""
+    meter = activity.metric_meter()
+    meter.create_histogram_timedelta(
+        "agent_llm_latency", "LLM call latency, queueing and hedging included", "ms"
+    ).record(latency, attributes)
+
+    prompt_tokens, cached_tokens, completion_tokens = token_usage(response)
+    tokens = meter.create_counter("agent_llm_tokens", "LLM tokens by kind")
+    tokens.add(prompt_tokens - cached_tokens, dict(attributes, kind="prompt_uncached"))
+    tokens.add(cached_tokens, dict(attributes, kind="prompt_cached"))
+    tokens.add(completion_tokens, dict(attributes, kind="completion"))
+
+
+def record_parse(attributes: Dict[str, str], outcome: str) -> None:
+    """Count a response parse; outcome is "ok", "repaired" or "failed"."""
+    activity.metric_meter().create_counter(
+        "agent_llm_response_parses", "LLM response JSON parses by outcome"
+    ).add(1, dict(attributes, outcome=outcome))
+
+
+def record_validation(bypassed: bool) -> None:
+    """Count prompt validations; bypassed ones were accepted without an LLM call."""
+    activity.metric_meter().create_counter(
+        "agent_prompt_validations", "Prompt validations"
+    ).add(1, {"bypassed": str(bypassed).lower()})
+
+
+def record_http_pool(stats: Dict[str, Any]) -> None:
+    """Publish the shared HTTP pool's connection reuse (see shared/http_pool.py)."""
+    meter = activity.metric_meter()
+    meter.create_gauge("agent_http_responses", "HTTP pool responses").set(
+        stats["responses"]
+    )
+    meter.create_gauge(
+        "agent_http_new_connections", "HTTP pool responses over new connections"
+    ).set(stats["new_connections"])
+    if stats["reuse_ratio"] is not None:
+        meter.create_gauge_float(
+            "agent_http_connection_reuse_ratio",
+            "Share of HTTP pool responses served over a reused connection",
+        ).set(stats["reuse_ratio"])
+    if stats["connect_seconds_avg"] is not None:
+        meter.create_gauge_float(
+            "agent_http_connect_seconds_avg", "Average HTTP connection setup time", "s"
+        ).set(stats["connect_seconds_avg"])
@@ -0,0 +1,72 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from models.requests import LLMCallSite
+
+LLM_CALL_SITES = ("validate", "plan", "summarize")
+
+
+@dataclass
+class LLMRoute:
+    model: str
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+    timeout: Optional[float] = None  # seconds
+    max_tokens: Optional[int] = None
+    history_token_budget: Optional[int] = None  # conversation history size in prompts
+
+
+def provider_of(model: str) -> Optional[str]:
+    """The LiteLLM provider prefix of a model name, e.g. "openai" for openai/gpt-4o."""
+    return model.split("/", 1)[0] if "/" in model else None
+
+
+def load_llm_routes() -> Dict[LLMCallSite, LLMRoute]:
+    """
+    Builds the model route for each LLM call site from the environment.
+
+    LLM_MODEL, LLM_KEY, LLM_BASE_URL, LLM_TIMEOUT, LLM_MAX_TOKENS and
+    LLM_HISTORY_TOKEN_BUDGET are the defaults; each can be overridden per call
+    site with a prefixed variable, e.g. LLM_VALIDATE_MODEL or
+    LLM_PLAN_HISTORY_TOKEN_BUDGET. A call site whose model is from another
+    provider than LLM_MODEL does not inherit LLM_KEY or LLM_BASE_URL, which
+    belong to that provider; it uses its own or LiteLLM's provider defaults.
+    """
+
+    def setting(call_site: str, name: str) -> Optional[str]:
+        return os.environ.get(f"LLM_{call_site.upper()}_{name}") or os.environ.get(
+            f"LLM_{name}"
+        )
+
+    routes = {}
+    for call_site in LLM_CALL_SITES:
+        timeout = setting(call_site, "TIMEOUT")
+        max_tokens = setting(call_site, "MAX_TOKENS")
+        history_token_budget = setting(call_site, "HISTORY_TOKEN_BUDGET")
+        model = setting(call_site, "MODEL") or "openai/gpt-4"
+        default_model = os.environ.get("LLM_MODEL") or "openai/gpt-4"
+        if provider_of(model) == provider_of(default_model):
+            api_key = setting(call_site, "KEY")
+            base_url = setting(call_site, "BASE_URL")
+        else:
+            prefix = f"LLM_{call_site.upper()}_"
+            api_key = os.environ.get(f"{prefix}KEY")
+            base_url = os.environ.get(f"{prefix}BASE_URL")
+            if not api_key and os.environ.get("LLM_KEY"):
+                print(
+                    f"Warning: {prefix}MODEL={model} is from another provider than "
+                    f"LLM_MODEL={default_model}, so LLM_KEY is not used for it; "
+                    f"set {prefix}KEY or the provider's own API key variable"
+                )
+        routes[call_site] = LLMRoute(
+            model=model,
+            api_key=api_key,
+            base_url=base_url,
+            timeout=float(timeout) if timeout else None,
+            max_tokens=int(max_tokens) if max_tokens else None,
+            history_token_budget=(
+                int(history_token_budget) if history_token_budget else None
+            ),
+        )
+    return routes
@@ -0,0 +1,150 @@
+import re
+from typing import AbstractSet, Any, Dict, List, Optional
+
+from models.core import AgentGoal, ToolArgument
+from models.requests import ConversationHistory
+
+# Low-content replies that only make sense as answers to the agent's last message
+AFFIRMATIONS = {
+    "yes",
+    "yes please",
+    "yeah",
+    "yep",
+    "sure",
+    "ok",
+    "okay",
+    "confirm",
+    "confirmed",
+    "correct",
+    "thats right",
+    "that is right",
+    "thats correct",
+    "sounds good",
+    "looks good",
+    "go ahead",
+    "please do",
+    "proceed",
+    "do it",
+}
+
+MONTHS = {
+    "january",
+    "february",
+    "march",
+    "april",
+    "may",
+    "june",
+    "july",
+    "august",
+    "september",
+    "october",
+    "november",
+    "december",
+}
+
+# Words that may accompany a month in a bare answer, e.g. "in may"
+MONTH_FILLER_WORDS = {"in", "of", "during", "around"}
+
+# Argument names that take a place, and so accept a bare city name from the catalog
+LOCATION_ARG_NAMES = {"city", "origin", "destination"}
+
+# Longest reply treated as a bare answer to the agent's question
+MAX_ANSWER_WORDS = 4
+
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_NUMBER = re.compile(r"^\$?\d+(\.\d+)?$")
+_YEAR = re.compile(r"^\d{4}$")
+
+
+def normalize(prompt: str) -> str:
+    """Lowercase, drop apostrophes and trailing punctuation, collapse whitespace."""
+    text = prompt.lower().replace("'", "").replace("’", "")
+    text = re.sub(r"[!?.,]+$", "", text.strip())
+    return " ".join(text.split())
+
+
+def last_agent_message(
+    conversation_history: ConversationHistory,
+) -> Optional[Dict[str, Any]]:
+    for message in reversed(conversation_history.get("messages", [])):
+        if message.get("actor") == "agent" and isinstance(message["response"], dict):
+            return message["response"]
+    return None
+
+
+def missing_arguments(
+    agent_message: Dict[str, Any], agent_goal: AgentGoal
+) -> List[ToolArgument]:
+    """The required arguments of the agent's current tool that are still unset."""
+    args = agent_message.get("args") or {}
+    tool = next(
+        (t for t in agent_goal.tools if t.name == agent_message.get("tool")), None
+    )
+    if tool is None:
+        return []
+    return [
+        arg for arg in tool.arguments if arg.required and args.get(arg.name) is None
+    ]
+
+
+def names_month(text: str) -> bool:
+    """Whether text is just a month, optionally with a year, e.g. "in May 2026"."""
+    words = [
+        word
+        for word in text.split()
+        if word not in MONTH_FILLER_WORDS and not _YEAR.match(word)
+    ]
+    return len(words) == 1 and words[0] in MONTHS
+
+
+def answers_argument(
+    text: str, arg: ToolArgument, known_places: AbstractSet[str]
+) -> bool:
+    """
+    Whether text fills the argument the agent is asking for with a value that can
+    be checked here: a month, an ISO date, a number, or one of known_places
+    (normalized city names from the event catalog). Anything else is left to
+    LLM validation.
+    """
+    name = arg.name.lower()
+    if "month" in name or "date" in name or arg.type == "ISO8601":
+        return names_month(text) or bool(_ISO_DATE.match(text))
+    if arg.type in ("float", "number", "int"):
+        return bool(_NUMBER.match(text))
+    if name in LOCATION_ARG_NAMES:
+        return text in known_places
+    return False
+
+
+def is_trivially_valid(
+    prompt: str,
+    conversation_history: ConversationHistory,
+    agent_goal: AgentGoal,
+    known_places: AbstractSet[str] = frozenset(),
+) -> Optional[str]:
+    """
+    Accepts prompts that are obviously fine without asking the LLM, such as "yes"
+    after a confirmation or a month name after the agent asked for one.
+    Returns the reason for accepting, or None if the prompt needs LLM validation.
+    It never rejects a prompt.
+    """
+    agent_message = last_agent_message(conversation_history)
+    if agent_message is None or agent_message.get("next") not in (
+        "question",
+        "confirm",
+    ):
+        return None
+
+    text = normalize(prompt)
+    if not text or len(text.split()) > MAX_ANSWER_WORDS:
+        return None
+
+    if text in AFFIRMATIONS:
+        return "affirmation"
+
+    # e.g. "May" when the agent is still missing FindEvents' month
+    for arg in missing_arguments(agent_message, agent_goal):
+        if answers_argument(text, arg, known_places):
+            return f"answers {arg.name}"
+
+    return None
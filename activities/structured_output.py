@@ -0,0 +1,71 @@
+import os
+from typing import Any, Dict, List, Optional
+
+import litellm
+from temporalio import activity
+
+from models.requests import TOOL_DATA_JSON_SCHEMA
+
+
+def json_mode_models() -> List[str]:
+    """Models listed in LLM_JSON_MODE_MODELS as supporting JSON mode (json_object)."""
+    return [
+        model.strip()
+        for model in os.environ.get("LLM_JSON_MODE_MODELS", "").split(",")
+        if model.strip()
+    ]
+
+
+def detect_structured_output_mode(model: str) -> str:
+    """
+    Picks how to ask the provider for JSON: "json_schema" (schema-constrained),
+    "json_object" (any JSON object) or "off". Only models LiteLLM reports as
+    supporting response schemas, or listed in LLM_JSON_MODE_MODELS, get JSON
+    mode; LiteLLM's supported params list response_format for models that reject
+    it. LLM_STRUCTURED_OUTPUT overrides the detection.
+    """
+    mode = os.environ.get("LLM_STRUCTURED_OUTPUT", "auto").lower()
+    if mode != "auto":
+        return mode
+    if model in json_mode_models():
+        return "json_object"
+    try:
+        if litellm.supports_response_schema(model=model):
+            return "json_schema"
+    except Exception as e:
+        # Unknown or custom models; fall back to prompting for JSON
+        activity.logger.info(f"Could not detect structured output support: {e}")
+    return "off"
+
+
+def mentions_json(messages: List[Dict[str, Any]]) -> bool:
+    """Whether any message contains the word "json", as OpenAI's JSON mode requires."""
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, list):  # content parts, e.g. with cache_control
+            content = " ".join(part.get("text", "") for part in content)
+        if "json" in content.lower():
+            return True
+    return False
+
+
+def response_format(
+    mode: str, tool_data_response: bool, messages: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """
+    The response_format for a call. Only planner calls return ToolData; other
+    calls (validation, summaries) return their own JSON shapes, and only get
+    JSON mode if their prompt asks for JSON, since providers reject it otherwise.
+    """
+    if mode == "json_schema" and tool_data_response:
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "ToolData",
+                "schema": TOOL_DATA_JSON_SCHEMA,
+                "strict": False,
+            },
+        }
+    if mode in ("json_schema", "json_object") and mentions_json(messages):
+        return {"type": "json_object"}
+    return None
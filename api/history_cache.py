@@ -0,0 +1,75 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+CacheKey = Tuple[str, Hashable]  # (workflow_id, query variant)
+
+
+class HistoryCache:
+    """In-process cache for conversation history reads, keyed by workflow ID.
+
+    Concurrent reads of the same key share a single in-flight load
+    (single-flight), and completed results are served for ttl_seconds.
+    Call invalidate() after signaling a workflow so the next read sees the
+    effect of the signal.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10_000) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[CacheKey, Tuple[float, Any]] = {}
+        self._inflight: Dict[CacheKey, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, key: CacheKey, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, loading it with loader if needed."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+            self.hits += 1
+            return entry[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            # shield so one caller disconnecting doesn't cancel the shared load
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        task = asyncio.create_task(loader())
+        self._inflight[key] = task
+        try:
+            value = await asyncio.shield(task)
+            # Don't store a result whose load was invalidated by a signal
+            if self._inflight.get(key) is task:
+                self._store(key, value)
+        finally:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+        return value
+
+    def _store(self, key: CacheKey, value: Any) -> None:
+        now = time.monotonic()
+        if len(self._entries) >= self.max_entries:
+            # Sessions come and go; drop everything that has expired
+            self._entries = {
+                k: v for k, v in self._entries.items() if now - v[0] < self.ttl_seconds
+            }
+        self._entries[key] = (now, value)
+
+    def invalidate(self, workflow_id: str) -> None:
+        """Drop cached and in-flight reads for a workflow."""
+        for key in [k for k in self._entries if k[0] == workflow_id]:
+            del self._entries[key]
+        # Later reads must not join a load that started before the signal
+        for key in [k for k in self._inflight if k[0] == workflow_id]:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._entries),
+        }
@@ -1,17 +1,38 @@
 import asyncio
+import json
+import os
+import uuid
 from collections import deque
 from contextlib import asynccontextmanager
-from typing import Dict, Optional
+from dataclasses import asdict
+from typing import AsyncIterator, Awaitable, Dict, Optional, Union
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from temporalio.api.enums.v1 import WorkflowExecutionStatus
-from temporalio.client import Client
+from temporalio.client import (
+    Client,
+    WithStartWorkflowOperation,
+    WorkflowHandle,
+    WorkflowQueryRejectedError,
+    WorkflowUpdateFailedError,
+)
+from temporalio.common import QueryRejectCondition, WorkflowIDConflictPolicy
 from temporalio.exceptions import TemporalError
-
-from models.requests import AgentGoalWorkflowParams, CombinedInput, ConversationHistory
+from temporalio.service import RPCError, RPCStatusCode
+
+from api.history_cache import HistoryCache
+from models.requests import (
+    AgentGoalWorkflowParams,
+    CombinedInput,
+    ConversationHistory,
+    ConversationHistoryDelta,
+    Message,
+)
 from shared.config import TEMPORAL_TASK_QUEUE, get_temporal_client
+from shared.tracing import setup_tracing, start_span
 from tools.goal_registry import goal_event_flight_invoice
 from workflows.agent_goal_workflow import AgentGoalWorkflow
 
@@ -21,8 +42,8 @@ temporal_client: Optional[Client] = None
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global temporal_client
-    # Create the Temporal client
-    temporal_client = await get_temporal_client()
+    # Create the Temporal client; its tracing interceptor carries request spans into workflows
+    temporal_client = await get_temporal_client(interceptors=setup_tracing("agent-api"))
     yield
 
 
@@ -33,6 +54,21 @@ load_dotenv()
 
 AGENT_GOAL = goal_event_flight_invoice
 
+# Stream wake-ups rejected for these statuses hit the server's per-workflow update
+# limits (too many in flight, or too many in total); streams then poll instead
+UPDATE_LIMIT_STATUSES = {
+    RPCStatusCode.RESOURCE_EXHAUSTED,
+    RPCStatusCode.FAILED_PRECONDITION,
+}
+STREAM_POLL_INTERVAL_SECONDS = 1.0
+
+# Repeated history reads for the same session within this window share one Temporal query
+HISTORY_CACHE_TTL_SECONDS = float(os.getenv("HISTORY_CACHE_TTL_SECONDS", "0.5"))
+history_cache = HistoryCache(ttl_seconds=HISTORY_CACHE_TTL_SECONDS)
+# Streams on the same session and cursor (e.g. several open tabs) share one
+# wait_for_messages update; each update is written to the workflow's history
+stream_wakeups = HistoryCache(ttl_seconds=0)
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -43,6 +79,16 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    # One root span per API request; Temporal calls made while handling it nest under it
+    with start_span(
+        f"{request.method} {request.url.path}",
+        {"http.method": request.method, "http.route": request.url.path},
+    ):
+        return await call_next(request)
+
+
 @app.get("/")
 def root() -> Dict[str, str]:
     return {"message": "Temporal AI Agent!"}
@@ -62,20 +108,26 @@ def _ensure_temporal_client() -> Client:
     return temporal_client
 
 
-@app.post("/start-workflow")
-async def start_workflow() -> Dict[str, str]:
-    """Start the AgentGoalWorkflow"""
-    temporal_client = _ensure_temporal_client()
+def _new_workflow_id() -> str:
+    """Mint a unique workflow ID for a new chat session."""
+    return f"agent-workflow-{uuid.uuid4()}"
 
-    # Create combined input
-    combined_input = CombinedInput(
+
+def _combined_input(with_starter_prompt: bool = True) -> CombinedInput:
+    """Build the workflow input, optionally queuing the goal's starter prompt."""
+    return CombinedInput(
         tool_params=AgentGoalWorkflowParams(
-            None, deque([f"### {AGENT_GOAL.starter_prompt}"])
+            None,
+            deque([f"### {AGENT_GOAL.starter_prompt}"] if with_starter_prompt else []),
         ),
         agent_goal=AGENT_GOAL,
     )
 
-    workflow_id = "agent-workflow"
+
+async def _start_agent_workflow(temporal_client: Client, workflow_id: str) -> None:
+    """Start an AgentGoalWorkflow for the given session's workflow ID."""
+    # Create combined input
+    combined_input = _combined_input()
 
     # Start the workflow with the starter prompt from the goal
     await temporal_client.start_workflow(
@@ -85,77 +137,167 @@ async def start_workflow() -> Dict[str, str]:
         task_queue=TEMPORAL_TASK_QUEUE,
     )
 
+
+@app.post("/start-workflow")
+async def start_workflow() -> Dict[str, str]:
+    """Start a new AgentGoalWorkflow session and return its workflow ID"""
+    temporal_client = _ensure_temporal_client()
+
+    workflow_id = _new_workflow_id()
+    await _start_agent_workflow(temporal_client, workflow_id)
+
     return {
-        "message": f"Workflow started with goal's starter prompt: {AGENT_GOAL.starter_prompt}."
+        "message": f"Workflow started with goal's starter prompt: {AGENT_GOAL.starter_prompt}.",
+        "workflow_id": workflow_id,
     }
 
 
 @app.post("/send-prompt")
-async def send_prompt(prompt: str) -> Dict[str, str]:
-    """Sends the user prompt to the Workflow"""
+async def send_prompt(workflow_id: str, prompt: str) -> Dict[str, str]:
+    """Sends the user prompt to the session's Workflow"""
     temporal_client = _ensure_temporal_client()
 
-    workflow_id = "agent-workflow"
     handle = temporal_client.get_workflow_handle(workflow_id)
     await handle.signal("user_prompt", prompt)
+    history_cache.invalidate(workflow_id)
 
     return {"message": f"Prompt '{prompt}' sent to workflow {workflow_id}."}
 
 
+@app.post("/send-prompt-and-wait")
+async def send_prompt_and_wait(
+    prompt: str, workflow_id: Optional[str] = None
+) -> Dict[str, Union[str, Message]]:
+    """Sends the user prompt to the Workflow and returns the agent's reply.
+
+    Without a workflow_id, a new session is started with this prompt as its
+    first message (update-with-start), saving a separate /start-workflow call.
+    """
+    temporal_client = _ensure_temporal_client()
+
+    try:
+        if workflow_id is None:
+            workflow_id = _new_workflow_id()
+            start_op = WithStartWorkflowOperation(
+                AgentGoalWorkflow.run,
+                _combined_input(with_starter_prompt=False),
+                id=workflow_id,
+                id_conflict_policy=WorkflowIDConflictPolicy.FAIL,
+                task_queue=TEMPORAL_TASK_QUEUE,
+            )
+            reply = await temporal_client.execute_update_with_start_workflow(
+                AgentGoalWorkflow.submit_prompt,
+                prompt,
+                start_workflow_operation=start_op,
+            )
+        else:
+            handle = temporal_client.get_workflow_handle(workflow_id)
+            reply = await handle.execute_update(AgentGoalWorkflow.submit_prompt, prompt)
+    except WorkflowUpdateFailedError as e:
+        # e.g. the chat already ended, or the session is moving to a new run
+        print(f"Prompt update failed: {e.cause}")
+        raise HTTPException(
+            status_code=409,
+            detail=f"Prompt not accepted by workflow {workflow_id}: {e.cause}",
+        )
+    finally:
+        history_cache.invalidate(workflow_id)
+
+    return {"workflow_id": workflow_id, "reply": reply}
+
+
 @app.post("/confirm")
-async def send_confirm() -> Dict[str, str]:
-    """Sends a 'confirm' signal to the workflow."""
+async def send_confirm(workflow_id: str) -> Dict[str, str]:
+    """Sends a 'confirm' signal to the session's workflow."""
     temporal_client = _ensure_temporal_client()
 
-    workflow_id = "agent-workflow"
     handle = temporal_client.get_workflow_handle(workflow_id)
     await handle.signal("confirm")
+    history_cache.invalidate(workflow_id)
     return {"message": "Confirm signal sent."}
 
 
 @app.post("/end-chat")
-async def end_chat() -> Dict[str, str]:
-    """Sends a 'end_chat' signal to the workflow."""
+async def end_chat(workflow_id: str) -> Dict[str, str]:
+    """Sends a 'end_chat' signal to the session's workflow."""
     temporal_client = _ensure_temporal_client()
 
-    workflow_id = "agent-workflow"
     handle = temporal_client.get_workflow_handle(workflow_id)
     await handle.signal("end_chat")
+    history_cache.invalidate(workflow_id)
     return {"message": "End chat signal sent."}
 
 
-@app.get("/get-conversation-history")
-async def get_conversation_history() -> ConversationHistory:
-    """Calls the workflow's 'get_conversation_history' query."""
+async def _query_conversation_history(
+    handle: WorkflowHandle, offset: Optional[int]
+) -> Union[ConversationHistory, ConversationHistoryDelta]:
+    """Query the workflow's history (or the delta after offset) in a single RPC.
 
-    temporal_client = _ensure_temporal_client()
+    Failed, canceled and terminated workflows are detected from the query's own
+    rejection instead of a separate describe() call.
+    """
+    failed_states = [
+        WorkflowExecutionStatus.WORKFLOW_EXECUTION_STATUS_TERMINATED,
+        WorkflowExecutionStatus.WORKFLOW_EXECUTION_STATUS_CANCELED,
+        WorkflowExecutionStatus.WORKFLOW_EXECUTION_STATUS_FAILED,
+    ]
 
+    # Set a timeout for the query
     try:
-        handle = temporal_client.get_workflow_handle("agent-workflow")
-
-        failed_states = [
-            WorkflowExecutionStatus.WORKFLOW_EXECUTION_STATUS_TERMINATED,
-            WorkflowExecutionStatus.WORKFLOW_EXECUTION_STATUS_CANCELED,
-            WorkflowExecutionStatus.WORKFLOW_EXECUTION_STATUS_FAILED,
-        ]
-
-        description = await handle.describe()
-        if description.status in failed_states:
-            print("Workflow is in a failed state. Returning empty history.")
-            return []
-
-        # Set a timeout for the query
         try:
-            conversation_history = await asyncio.wait_for(
-                handle.query("get_conversation_history"),
+            return await asyncio.wait_for(
+                _history_query(
+                    handle, offset, QueryRejectCondition.NOT_COMPLETED_CLEANLY
+                ),
                 timeout=5,  # Timeout after 5 seconds
             )
-            return conversation_history
-        except asyncio.TimeoutError:
-            raise HTTPException(
-                status_code=404,
-                detail="Temporal query timed out (worker may be unavailable).",
+        except WorkflowQueryRejectedError as e:
+            if e.status in failed_states:
+                print("Workflow is in a failed state. Returning empty history.")
+                return []
+            # Closed some other way (e.g. timed out); its history is still readable
+            return await asyncio.wait_for(
+                _history_query(handle, offset, QueryRejectCondition.NONE),
+                timeout=5,
             )
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=404,
+            detail="Temporal query timed out (worker may be unavailable).",
+        )
+
+
+def _history_query(
+    handle: WorkflowHandle,
+    offset: Optional[int],
+    reject_condition: QueryRejectCondition,
+) -> Awaitable[Union[ConversationHistory, ConversationHistoryDelta]]:
+    if offset is not None:
+        return handle.query(
+            AgentGoalWorkflow.get_conversation_history_since,
+            offset,
+            reject_condition=reject_condition,
+        )
+    return handle.query("get_conversation_history", reject_condition=reject_condition)
+
+
+@app.get("/get-conversation-history")
+async def get_conversation_history(
+    workflow_id: str, offset: Optional[int] = None
+) -> Union[ConversationHistory, ConversationHistoryDelta]:
+    """Calls the session workflow's 'get_conversation_history' query.
+
+    If offset is given, only the messages after it are returned (along with the
+    current history length) so polling clients fetch constant-size deltas.
+    """
+
+    temporal_client = _ensure_temporal_client()
+
+    try:
+        handle = temporal_client.get_workflow_handle(workflow_id)
+        return await history_cache.get(
+            (workflow_id, offset), lambda: _query_conversation_history(handle, offset)
+        )
 
     except TemporalError as e:
         error_message = str(e)
@@ -167,11 +309,88 @@ async def get_conversation_history() -> ConversationHistory:
                 status_code=404, detail="Workflow worker unavailable or not found."
             )
 
+        # Sessions are only created by /start-workflow; don't mint one for a stale ID
         if "workflow not found" in error_message:
-            await start_workflow()
-            return []
+            raise HTTPException(
+                status_code=404, detail=f"Workflow {workflow_id} not found."
+            )
         else:
             # For other Temporal errors, return a 500
             raise HTTPException(
                 status_code=500, detail="Internal server error while querying workflow."
             )
+
+
+async def _final_history_delta(
+    handle: WorkflowHandle, cursor: int
+) -> Optional[ConversationHistoryDelta]:
+    """The messages after cursor of a workflow that may have closed, if any."""
+    try:
+        delta = await asyncio.wait_for(
+            handle.query(
+                AgentGoalWorkflow.get_conversation_history_since,
+                cursor,
+                reject_condition=QueryRejectCondition.NONE,
+            ),
+            timeout=5,
+        )
+    except (TemporalError, asyncio.TimeoutError) as e:
+        print(f"Could not read the final history: {e}")
+        return None
+    if not (delta.messages or delta.offset != cursor):
+        return None
+    return delta
+
+
+@app.get("/stream-conversation")
+async def stream_conversation(workflow_id: str, offset: int = 0) -> StreamingResponse:
+    """Streams new conversation messages to the client as Server-Sent Events.
+
+    Each event carries a ConversationHistoryDelta. The workflow's
+    wait_for_messages update only signals that something changed; the delta is
+    read with a query. The stream ends when the chat ends or the workflow is no
+    longer running, after sending whatever the workflow recorded last.
+    """
+    temporal_client = _ensure_temporal_client()
+    handle = temporal_client.get_workflow_handle(workflow_id)
+
+    async def event_stream() -> AsyncIterator[str]:
+        cursor = offset
+        while True:
+            try:
+                try:
+                    # Long-poll the workflow; resolves as soon as add_message records something new
+                    await stream_wakeups.get(
+                        (workflow_id, cursor),
+                        lambda: handle.execute_update(
+                            AgentGoalWorkflow.wait_for_messages, cursor
+                        ),
+                    )
+                except RPCError as e:
+                    if e.status not in UPDATE_LIMIT_STATUSES:
+                        raise
+                    # The session has too many updates; poll the query instead
+                delta = await handle.query(
+                    AgentGoalWorkflow.get_conversation_history_since, cursor
+                )
+            except TemporalError as e:
+                print(f"Temporal error while streaming: {e}")
+                # e.g. the workflow completed; send what it recorded since the cursor
+                final = await _final_history_delta(handle, cursor)
+                if final is not None:
+                    yield f"data: {json.dumps(asdict(final))}\n\n"
+                yield "event: end\ndata: {}\n\n"
+                return
+
+            if not (delta.messages or delta.offset != cursor or delta.chat_ended):
+                # Nothing new (polling, or the run is handing over to a new one)
+                await asyncio.sleep(STREAM_POLL_INTERVAL_SECONDS)
+                continue
+
+            cursor = delta.total
+            yield f"data: {json.dumps(asdict(delta))}\n\n"
+            if delta.chat_ended:
+                yield "event: end\ndata: {}\n\n"
+                return
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
@@ -3,9 +3,9 @@ import NavBar from "../components/NavBar";
 import ChatWindow from "../components/ChatWindow";
 import { apiService } from "../services/api";
 
-const POLL_INTERVAL = 1000; // 1 second
 const INITIAL_ERROR_STATE = { visible: false, message: '' };
 const DEBOUNCE_DELAY = 300; // 300ms debounce for user input
+const WORKFLOW_ID_KEY = 'workflowId'; // sessionStorage key for this tab's chat session
 
 function useDebounce(value, delay) {
     const [debouncedValue, setDebouncedValue] = useState(value);
@@ -26,7 +26,6 @@ function useDebounce(value, delay) {
 export default function App() {
     const containerRef = useRef(null);
     const inputRef = useRef(null);
-    const pollingRef = useRef(null);
     const scrollTimeoutRef = useRef(null);
     
     const [conversation, setConversation] = useState([]);
@@ -35,6 +34,7 @@ export default function App() {
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState(INITIAL_ERROR_STATE);
     const [done, setDone] = useState(true);
+    const [workflowId, setWorkflowId] = useState(null);
 
     const debouncedUserInput = useDebounce(userInput, DEBOUNCE_DELAY);
 
@@ -75,47 +75,71 @@ export default function App() {
         setError(INITIAL_ERROR_STATE);
     }, []);
     
-    const fetchConversationHistory = useCallback(async () => {
-        try {
-            const data = await apiService.getConversationHistory();
-            const newConversation = data.messages || [];
+    const applyConversation = useCallback((newConversation) => {
+        setConversation(prevConversation => 
+            JSON.stringify(prevConversation) !== JSON.stringify(newConversation) ? newConversation : prevConversation
+        );
+
+        if (newConversation.length > 0) {
+            const lastMsg = newConversation[newConversation.length - 1];
+            const isAgentMessage = lastMsg.actor === "agent";
             
-            setConversation(prevConversation => 
-                JSON.stringify(prevConversation) !== JSON.stringify(newConversation) ? newConversation : prevConversation
+            setLoading(!isAgentMessage);
+            setDone(lastMsg.response.next === "done");
+
+            setLastMessage(prevLastMessage =>
+                !prevLastMessage || lastMsg.response.response !== prevLastMessage.response.response
+                    ? lastMsg
+                    : prevLastMessage
             );
-    
-            if (newConversation.length > 0) {
-                const lastMsg = newConversation[newConversation.length - 1];
-                const isAgentMessage = lastMsg.actor === "agent";
-                
-                setLoading(!isAgentMessage);
-                setDone(lastMsg.response.next === "done");
-    
-                setLastMessage(prevLastMessage =>
-                    !prevLastMessage || lastMsg.response.response !== prevLastMessage.response.response
-                        ? lastMsg
-                        : prevLastMessage
-                );
-            } else {
-                setLoading(false);
-                setDone(true);
-                setLastMessage(null);
-            }
-    
-            // Successfully fetched data, clear any persistent errors
-            clearErrorOnSuccess();
-        } catch (err) {
-            handleError(err, "fetching conversation");
+        } else {
+            setLoading(false);
+            setDone(true);
+            setLastMessage(null);
         }
-    }, [handleError, clearErrorOnSuccess]);
-    
-    // Setup polling with cleanup
+    }, []);
+
+    // Subscribe to pushed conversation updates instead of polling
     useEffect(() => {
-        pollingRef.current = setInterval(fetchConversationHistory, POLL_INTERVAL);
-        
-        return () => clearInterval(pollingRef.current);
-    }, [fetchConversationHistory]);
+        if (!workflowId) return;
+
+        let messages = [];
+        const source = apiService.streamConversation(workflowId, {
+            onDelta: (delta) => {
+                messages = messages.slice(0, delta.offset).concat(delta.messages);
+                applyConversation(messages);
+                if (delta.chat_ended) setDone(true);
+                // Successfully received data, clear any persistent errors
+                clearErrorOnSuccess();
+            },
+            onEnd: () => setLoading(false),
+            onError: (err) => handleError(err, "fetching conversation"),
+        });
+
+        return () => source.close();
+    }, [workflowId, applyConversation, handleError, clearErrorOnSuccess]);
     
+    const startSession = useCallback(async () => {
+        const data = await apiService.startWorkflow();
+        sessionStorage.setItem(WORKFLOW_ID_KEY, data.workflow_id);
+        setWorkflowId(data.workflow_id);
+    }, []);
+
+    // Each browser tab gets its own workflow, reused across page reloads
+    useEffect(() => {
+        const storedId = sessionStorage.getItem(WORKFLOW_ID_KEY);
+        const resume = storedId
+            ? apiService.getConversationHistory(storedId)
+                .then(() => setWorkflowId(storedId))
+                .catch(err => {
+                    // The stored session is gone (e.g. the server was reset)
+                    if (err.status !== 404) throw err;
+                    return startSession();
+                })
+            : startSession();
+        resume.catch(err => handleError(err, "starting chat"));
+    }, [handleError, startSession]);
+
 
     const scrollToBottom = useCallback(() => {
         if (containerRef.current) {
@@ -160,7 +184,7 @@ export default function App() {
         try {
             setLoading(true);
             setError(INITIAL_ERROR_STATE);
-            await apiService.sendMessage(trimmedInput);
+            await apiService.sendMessage(workflowId, trimmedInput);
             setUserInput("");
         } catch (err) {
             handleError(err, "sending message");
@@ -172,7 +196,7 @@ export default function App() {
         try {
             setLoading(true);
             setError(INITIAL_ERROR_STATE);
-            await apiService.confirm();
+            await apiService.confirm(workflowId);
         } catch (err) {
             handleError(err, "confirming action");
             setLoading(false);
@@ -183,7 +207,11 @@ export default function App() {
         try {
             setError(INITIAL_ERROR_STATE);
             setLoading(true);
-            await apiService.startWorkflow();
+            if (workflowId) {
+                // Let the old session finish instead of leaving it running
+                await apiService.endChat(workflowId).catch(() => {});
+            }
+            await startSession();
             setConversation([]);
             setLastMessage(null);
         } catch (err) {
@@ -20,9 +20,11 @@ async function handleResponse(response) {
 }
 
 export const apiService = {
-    async getConversationHistory() {
+    async getConversationHistory(workflowId) {
         try {
-            const res = await fetch(`${API_BASE_URL}/get-conversation-history`);
+            const res = await fetch(
+                `${API_BASE_URL}/get-conversation-history?workflow_id=${encodeURIComponent(workflowId)}`
+            );
             return handleResponse(res);
         } catch (error) {
             throw new ApiError(
@@ -32,14 +34,29 @@ export const apiService = {
         }
     },
 
-    async sendMessage(message) {
+    streamConversation(workflowId, { onDelta, onEnd, onError }) {
+        const source = new EventSource(
+            `${API_BASE_URL}/stream-conversation?workflow_id=${encodeURIComponent(workflowId)}`
+        );
+        source.onmessage = (event) => onDelta(JSON.parse(event.data));
+        source.addEventListener('end', () => {
+            source.close();
+            onEnd?.();
+        });
+        source.onerror = () => onError?.(
+            new ApiError('Lost connection to conversation stream', 503)
+        );
+        return source;
+    },
+
+    async sendMessage(workflowId, message) {
         if (!message?.trim()) {
             throw new ApiError('Message cannot be empty', 400);
         }
 
         try {
             const res = await fetch(
-                `${API_BASE_URL}/send-prompt?prompt=${encodeURIComponent(message)}`,
+                `${API_BASE_URL}/send-prompt?workflow_id=${encodeURIComponent(workflowId)}&prompt=${encodeURIComponent(message)}`,
                 { 
                     method: 'POST',
                     headers: {
@@ -76,9 +93,26 @@ export const apiService = {
         }
     },
 
-    async confirm() {
+    async endChat(workflowId) {
+        try {
+            const res = await fetch(`${API_BASE_URL}/end-chat?workflow_id=${encodeURIComponent(workflowId)}`, { 
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                }
+            });
+            return handleResponse(res);
+        } catch (error) {
+            throw new ApiError(
+                'Failed to end chat',
+                error.status || 500
+            );
+        }
+    },
+
+    async confirm(workflowId) {
         try {
-            const res = await fetch(`${API_BASE_URL}/confirm`, { 
+            const res = await fetch(`${API_BASE_URL}/confirm?workflow_id=${encodeURIComponent(workflowId)}`, { 
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
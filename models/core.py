@@ -7,6 +7,8 @@ class ToolArgument:
     name: str
     type: str
     description: str
+    # Optional arguments may be left null; the tool is run without them
+    required: bool = True
 
 
 @dataclass
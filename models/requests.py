@@ -8,6 +8,7 @@ from models.core import AgentGoal
 Message = Dict[str, Union[str, Dict[str, Any]]]
 ConversationHistory = Dict[str, List[Message]]
 NextStep = Literal["confirm", "question", "done"]
+LLMCallSite = Literal["validate", "plan", "summarize"]
 CurrentTool = str
 
 
@@ -26,7 +27,12 @@ class CombinedInput:
 @dataclass
 class ToolPromptInput:
     prompt: str
-    context_instructions: str
+    context_instructions: str  # static prefix, identical across turns
+    dynamic_context: Optional[str] = None  # per-turn context sent after the prefix
+    tool_data_response: bool = False  # the response must be a ToolData object
+    call_site: LLMCallSite = (
+        "plan"  # selects the model route, see activities/llm_routing.py
+    )
 
 
 @dataclass
@@ -42,15 +48,27 @@ class ValidationResult:
     validationFailedReason: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass
+class ConversationHistoryDelta:
+    messages: List[Message]
+    offset: int  # index in the full history of the first message in `messages`
+    total: int  # current length of the full history
+    chat_ended: bool = False
+
+
 @dataclass
 class EnvLookupInput:
     show_confirm_env_var_name: str
     show_confirm_default: bool
+    speculative_planning_env_var_name: str = "SPECULATIVE_PLANNING"
+    speculative_planning_default: bool = False
 
 
 @dataclass
 class EnvLookupOutput:
     show_confirm: bool
+    speculative_planning: bool = False
+    history_token_budget: Optional[int] = None  # for planner prompts
 
 
 class ToolData(TypedDict, total=False):
@@ -59,3 +77,16 @@ class ToolData(TypedDict, total=False):
     response: str
     args: Dict[str, Any]
     force_confirm: bool
+
+
+# JSON schema for ToolData, used to request structured output from the LLM
+TOOL_DATA_JSON_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "response": {"type": "string"},
+        "next": {"type": "string", "enum": ["question", "confirm", "done"]},
+        "tool": {"type": ["string", "null"]},
+        "args": {"type": "object"},
+    },
+    "required": ["response", "next", "tool", "args"],
+}
@@ -1,38 +1,51 @@
 import json
-from typing import Optional
+from typing import Optional, Union
 
 from models.core import AgentGoal
 from models.requests import ConversationHistory, ToolData
 from prompts.prompts import (
-    GENAI_PROMPT,
+    GENAI_PROMPT_DYNAMIC,
+    GENAI_PROMPT_STATIC,
     MISSING_ARGS_PROMPT,
     TOOL_COMPLETION_PROMPT,
     TOOLCHAIN_COMPLETE_GUIDANCE_PROMPT,
 )
 
 
-def generate_genai_prompt(
-    agent_goal: AgentGoal,
-    conversation_history: ConversationHistory,
+def generate_genai_prompt(agent_goal: AgentGoal) -> str:
+    """
+    Generates the static part of the prompt for producing or validating JSON
+    instructions: the goal, the example conversation, the tools and the guardrails.
+    It only depends on the goal, so providers can cache it as a prompt prefix.
+    """
+    return GENAI_PROMPT_STATIC.render(
+        agent_goal=agent_goal,
+        toolchain_complete_guidance=TOOLCHAIN_COMPLETE_GUIDANCE_PROMPT,
+    )
+
+
+def generate_genai_prompt_context(
+    conversation_history: Union[ConversationHistory, str],
     raw_json: Optional[ToolData] = None,
 ) -> str:
     """
-    Generates a concise prompt for producing or validating JSON instructions
-    with the provided tools and conversation history.
+    Generates the per-turn part of the prompt: the conversation history and, if
+    given, the previous JSON response to validate. The history may be passed
+    already serialized (see prompts.history_window.SerializedHistory).
     """
+    if not isinstance(conversation_history, str):
+        conversation_history = json.dumps(conversation_history, indent=2)
 
     # Prepare template variables
     template_vars = {
-        "agent_goal": agent_goal,
-        "conversation_history_json": json.dumps(conversation_history, indent=2),
-        "toolchain_complete_guidance": TOOLCHAIN_COMPLETE_GUIDANCE_PROMPT,
+        "conversation_history_json": conversation_history,
         "raw_json": raw_json,
         "raw_json_str": (
             json.dumps(raw_json, indent=2) if raw_json is not None else None
         ),
     }
 
-    return GENAI_PROMPT.render(**template_vars)
+    return GENAI_PROMPT_DYNAMIC.render(**template_vars)
 
 
 def generate_tool_completion_prompt(current_tool: str, dynamic_result: dict) -> str:
@@ -0,0 +1,186 @@
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from models.requests import ConversationHistory, Message
+
+# Messages at the end of the history that are always sent verbatim
+KEEP_RECENT_MESSAGES = 10
+
+# Older user/agent messages are cut down to this many characters before being dropped
+ELIDED_MESSAGE_CHARS = 120
+
+
+def estimate_tokens(value: Any) -> int:
+    """
+    Rough token count (about 4 characters per token) of a value as it appears in
+    the prompt. It is deterministic and dependency-free so it can run in workflow code.
+    """
+    text = value if isinstance(value, str) else json.dumps(value, indent=2)
+    return len(text) // 4 + 1
+
+
+def _is_pinned(
+    index: int, message: Message, latest_tool_results: Dict[str, int]
+) -> bool:
+    # The latest result of each tool feeds arguments of later tools (e.g. event
+    # dates for SearchFlights, the flight price for CreateInvoice); summaries
+    # stand in for everything before a continue-as-new.
+    if message["actor"] == "conversation_summary":
+        return True
+    if message["actor"] == "tool_result" and isinstance(message["response"], dict):
+        return latest_tool_results.get(message["response"].get("tool")) == index
+    return False
+
+
+def _elide(message: Message) -> Message:
+    response = message["response"]
+    if isinstance(response, dict):
+        response = str(response.get("response", response))
+    if len(response) > ELIDED_MESSAGE_CHARS:
+        response = response[:ELIDED_MESSAGE_CHARS] + "..."
+    return {"actor": message["actor"], "response": response}
+
+
+def _fragment(message: Message) -> str:
+    # A message as it appears inside json.dumps({"messages": [...]}, indent=2)
+    return "\n".join(
+        "    " + line for line in json.dumps(message, indent=2).split("\n")
+    )
+
+
+def _cost(fragment: str) -> int:
+    # What a message adds to the estimate of the rendered history, indentation included
+    return len(fragment) // 4 + 1
+
+
+def _join(fragments: List[str]) -> str:
+    if not fragments:
+        return '{\n  "messages": []\n}'
+    return '{\n  "messages": [\n' + ",\n".join(fragments) + "\n  ]\n}"
+
+
+# A windowed history is a list of entries: the index of an original message kept
+# verbatim, or a replacement message (shortened message or omission note)
+WindowEntry = Union[int, Message]
+
+
+def _window(
+    messages: List[Message],
+    token_budget: int,
+    keep_recent: int,
+    cost_of: Callable[[int], int],
+) -> List[WindowEntry]:
+    older_count = max(0, len(messages) - keep_recent)
+    latest_tool_results = {}
+    for index, message in enumerate(messages):
+        if message["actor"] == "tool_result" and isinstance(message["response"], dict):
+            latest_tool_results[message["response"].get("tool")] = index
+
+    # (entry, droppable) for each older message
+    older: List[Tuple[WindowEntry, bool]] = []
+    for index, message in enumerate(messages[:older_count]):
+        if _is_pinned(index, message, latest_tool_results):
+            older.append((index, False))
+        else:
+            older.append((_elide(message), True))
+    recent: List[WindowEntry] = list(range(older_count, len(messages)))
+
+    def cost(entry: WindowEntry) -> int:
+        return cost_of(entry) if isinstance(entry, int) else estimate_tokens(entry)
+
+    # Drop the oldest droppable messages until the estimate fits the budget
+    total = sum(cost(entry) for entry, _ in older) + sum(cost(i) for i in recent)
+    dropped = 0
+    for entry, droppable in older:
+        if total <= token_budget:
+            break
+        if droppable:
+            total -= cost(entry)
+            dropped += 1
+
+    kept: List[WindowEntry] = []
+    if dropped:
+        kept.append(
+            {
+                "actor": "system",
+                "response": f"{dropped} earlier messages omitted to save space",
+            }
+        )
+    remaining = dropped
+    for entry, droppable in older:
+        if droppable and remaining:
+            remaining -= 1
+            continue
+        kept.append(entry)
+    return kept + recent
+
+
+def window_conversation_history(
+    conversation_history: ConversationHistory,
+    token_budget: Optional[int],
+    keep_recent: int = KEEP_RECENT_MESSAGES,
+) -> Tuple[ConversationHistory, int]:
+    """
+    Fits the conversation history into token_budget for a prompt.
+
+    The last keep_recent messages and the latest result of each tool are kept
+    verbatim. Older messages are shortened first and, if that is not enough,
+    dropped oldest first and replaced by a note saying how many were omitted.
+
+    Returns the windowed history and the estimated number of tokens saved.
+    """
+    full_tokens = estimate_tokens(conversation_history)
+    if token_budget is None or full_tokens <= token_budget:
+        return conversation_history, 0
+
+    messages = conversation_history["messages"]
+    entries = _window(
+        messages, token_budget, keep_recent, lambda i: _cost(_fragment(messages[i]))
+    )
+    windowed: ConversationHistory = {
+        "messages": [messages[e] if isinstance(e, int) else e for e in entries]
+    }
+    return windowed, max(0, full_tokens - estimate_tokens(windowed))
+
+
+class SerializedHistory:
+    """
+    Append-only, pre-serialized copy of a conversation history.
+
+    Each message is serialized once, when it is added; rendering joins the cached
+    fragments, producing exactly json.dumps(conversation_history, indent=2).
+    This keeps per-turn prompt rendering (and workflow replay) from
+    re-serializing the whole history every turn.
+    """
+
+    def __init__(self) -> None:
+        self.fragments: List[str] = []
+
+    def append(self, message: Message) -> None:
+        self.fragments.append(_fragment(message))
+
+    def render(
+        self,
+        conversation_history: ConversationHistory,
+        token_budget: Optional[int] = None,
+        keep_recent: int = KEEP_RECENT_MESSAGES,
+    ) -> Tuple[str, int]:
+        """
+        Renders the history as JSON, windowed to token_budget like
+        window_conversation_history. Returns the JSON and the estimated tokens saved.
+        """
+        full = _join(self.fragments)
+        full_tokens = estimate_tokens(full)
+        if token_budget is None or full_tokens <= token_budget:
+            return full, 0
+
+        entries = _window(
+            conversation_history["messages"],
+            token_budget,
+            keep_recent,
+            lambda i: _cost(self.fragments[i]),
+        )
+        windowed = _join(
+            [self.fragments[e] if isinstance(e, int) else _fragment(e) for e in entries]
+        )
+        return windowed, max(0, full_tokens - estimate_tokens(windowed))
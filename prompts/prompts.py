@@ -1,18 +1,12 @@
 from jinja2 import Template
 
-# Define the Jinja2 template
-GENAI_PROMPT = Template(
+# Define the Jinja2 templates. The prompt is split in two so providers can cache
+# the static per-goal prefix: it must not contain anything that changes per turn.
+GENAI_PROMPT_STATIC = Template(
     """
 You are an AI agent that helps fill required arguments for the tools described below. 
 You must respond with valid JSON ONLY, using the schema provided in the instructions.
 
-=== Conversation History ===
-This is the ongoing history to determine which tool and arguments to gather:
-*BEGIN CONVERSATION HISTORY*
-{{ conversation_history_json }}
-*END CONVERSATION HISTORY*
-REMINDER: You can use the conversation history to infer arguments for the tools.
-
 {% if agent_goal.example_conversation_history %}
 === Example Conversation With These Tools ===
 Use this example to understand how tools are invoked and arguments are gathered.
@@ -32,9 +26,15 @@ Only ask for arguments listed below. Do not add extra arguments.
 Tool name: {{ tool.name }}
   Description: {{ tool.description }}
   Required args:
-{% for arg in tool.arguments %}
+{% for arg in tool.arguments if arg.required %}
     - {{ arg.name }} ({{ arg.type }}): {{ arg.description }}
 {% endfor %}
+{% if tool.arguments|rejectattr('required')|list %}
+  Optional args (set to null if unknown; don't ask for them):
+{% for arg in tool.arguments|rejectattr('required') %}
+    - {{ arg.name }} ({{ arg.type }}): {{ arg.description }}
+{% endfor %}
+{% endif %}
 
 {% endfor %}
 When all required args for a tool are known, you can propose next='confirm' to run it.
@@ -68,7 +68,17 @@ EXAMPLE: If you have a question to ask, set next='question' and ask the user.
  EXAMPLE: If you asked for an account ID, then use the conversation history to infer that argument going forward.
 4) If ListAgents in the conversation history is force_confirm='False', you MUST check if the current tool contains userConfirmation. If it does, please ask the user to confirm details with the user. userConfirmation overrides force_confirm='False'.
 EXAMPLE: (force_confirm='False' AND userConfirmation exists on tool) Would you like me to <run tool> with the following details: <details>?
+""".strip()
+)
 
+GENAI_PROMPT_DYNAMIC = Template(
+    """
+=== Conversation History ===
+This is the ongoing history to determine which tool and arguments to gather:
+*BEGIN CONVERSATION HISTORY*
+{{ conversation_history_json }}
+*END CONVERSATION HISTORY*
+REMINDER: You can use the conversation history to infer arguments for the tools.
 {% if raw_json is not none %}
 
 === Validation Task ===
@@ -0,0 +1,91 @@
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from tools.event_store import EventStore, SQLiteEventStore, import_events
+
+# Compares the original find_events JSON scan with the in-memory and SQLite event
+# stores on synthetic catalogs, e.g. python -m scripts.event_store_benchmark 10000
+
+
+def json_scan(path: Path, search_city: str, valid_months: list) -> int:
+    # The original find_events loop: load the file and parse every event's dates
+    with open(path) as f:
+        data = json.load(f)
+    count = 0
+    for city_name, events in data.items():
+        if search_city and search_city not in city_name.lower():
+            continue
+        for event in events:
+            date_from = datetime.strptime(event["dateFrom"], "%Y-%m-%d").date()
+            date_to = datetime.strptime(event["dateTo"], "%Y-%m-%d").date()
+            if date_from.month in valid_months or date_to.month in valid_months:
+                count += 1
+    return count
+
+
+def make_catalog(path: Path, size: int, cities: int = 500) -> None:
+    rng = random.Random(size)
+    data = {f"City {i}": [] for i in range(cities)}
+    for i in range(size):
+        start = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+        data[f"City {rng.randrange(cities)}"].append(
+            {
+                "eventName": f"Event {i}",
+                "dateFrom": start.isoformat(),
+                "dateTo": (start + timedelta(days=rng.randrange(10))).isoformat(),
+                "description": "A synthetic event used for benchmarking.",
+            }
+        )
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def timed(fn, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    months = [4, 5, 6]
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            json_path = Path(tmp) / f"events_{size}.json"
+            db_path = Path(tmp) / f"events_{size}.db"
+            make_catalog(json_path, size)
+
+            start = time.perf_counter()
+            import_events(json_path, db_path)
+            import_seconds = time.perf_counter() - start
+
+            memory = EventStore(json_path)
+            start = time.perf_counter()
+            memory.events_in_months("", months)  # first call loads and indexes
+            load_seconds = time.perf_counter() - start
+            sqlite = SQLiteEventStore(db_path)
+
+            print(
+                f"{size} events (JSON load+index {load_seconds:.2f}s, "
+                f"SQLite import {import_seconds:.2f}s)"
+            )
+            for label, city in (("one city", "city 42"), ("all cities", "")):
+                expected = json_scan(json_path, city, months)
+                assert len(memory.events_in_months(city, months)) == expected
+                assert len(sqlite.events_in_months(city, months)) == expected
+                scan_ms = timed(
+                    lambda: json_scan(json_path, city, months),
+                    1 if size >= 1_000_000 else 3,
+                )
+                memory_ms = timed(lambda: memory.events_in_months(city, months), 10)
+                sqlite_ms = timed(lambda: sqlite.events_in_months(city, months), 10)
+                print(
+                    f"  {label} ({expected} matches): JSON scan {scan_ms:.1f}ms, "
+                    f"in-memory {memory_ms:.2f}ms, SQLite {sqlite_ms:.2f}ms"
+                )
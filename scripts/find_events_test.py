@@ -7,3 +7,16 @@ if __name__ == "__main__":
     search_args = {"city": "Austin", "month": "December"}
     results = find_events(search_args)
     print(json.dumps(results, indent=2))
+
+    # Malformed arguments come back as errors the planner can correct
+    for malformed in (
+        {"queries": "Austin in December"},
+        {"queries": ["Austin", "December"]},
+        {"queries": [None]},
+        {"queries": [{"city": ["Austin"], "month": "December"}]},
+        {"city": "Austin", "month": 12},
+        {"city": "Austin", "month": "December", "query": ["jazz"]},
+    ):
+        result = find_events(malformed)
+        print(f"{malformed} -> {result}")
+        assert set(result) == {"error"}
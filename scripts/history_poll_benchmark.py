@@ -0,0 +1,73 @@
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+from temporalio.common import QueryRejectCondition
+
+from models.requests import AgentGoalWorkflowParams, CombinedInput
+from shared.config import TEMPORAL_TASK_QUEUE, get_temporal_client
+from tools.goal_registry import goal_event_flight_invoice
+from workflows.agent_goal_workflow import AgentGoalWorkflow
+
+# Compares the old history poll (describe() + query) with the single-RPC query
+# that relies on the query's reject condition.
+# Requires a local Temporal dev server (`temporal server start-dev`) and a running
+# worker (`uv run worker/worker.py`).
+# Usage: uv run scripts/history_poll_benchmark.py [iterations]
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def time_calls(label: str, call, iterations: int) -> None:
+    await call()  # warm up the worker's sticky cache
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - start) * 1000)
+    print(
+        f"{label:<28} p50={percentile(samples, 50):7.2f}ms "
+        f"p99={percentile(samples, 99):7.2f}ms mean={statistics.mean(samples):7.2f}ms"
+    )
+
+
+async def main(iterations: int) -> None:
+    client = await get_temporal_client()
+
+    # No starter prompt, so the workflow sits idle and no LLM calls are made
+    handle = await client.start_workflow(
+        AgentGoalWorkflow.run,
+        CombinedInput(
+            tool_params=AgentGoalWorkflowParams(),
+            agent_goal=goal_event_flight_invoice,
+        ),
+        id=f"history-poll-benchmark-{uuid.uuid4()}",
+        task_queue=TEMPORAL_TASK_QUEUE,
+    )
+
+    async def describe_then_query():
+        await handle.describe()
+        await handle.query("get_conversation_history")
+
+    async def query_only():
+        await handle.query(
+            "get_conversation_history",
+            reject_condition=QueryRejectCondition.NOT_COMPLETED_CLEANLY,
+        )
+
+    try:
+        print(f"{iterations} polls against workflow {handle.id}")
+        await time_calls("describe() + query()", describe_then_query, iterations)
+        await time_calls("query() with reject condition", query_only, iterations)
+    finally:
+        await handle.signal(AgentGoalWorkflow.end_chat)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
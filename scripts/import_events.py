@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+from tools.event_store import (
+    DEFAULT_EVENTS_DB_PATH,
+    DEFAULT_EVENTS_PATH,
+    import_events,
+)
+
+# Builds the SQLite catalog used when FIND_EVENTS_BACKEND=sqlite, e.g.
+#   python -m scripts.import_events [events.json|events.jsonl] [find_events.db]
+if __name__ == "__main__":
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_EVENTS_PATH
+    db_path = Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_EVENTS_DB_PATH
+    count = import_events(source, db_path)
+    print(f"Imported {count} events from {source} into {db_path}")
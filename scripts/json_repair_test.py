@@ -0,0 +1,28 @@
+from activities.json_repair import parse_json_tolerant
+
+# Checks which malformed LLM replies can be recovered, and what they parse to.
+
+
+if __name__ == "__main__":
+    cases = [
+        ('{"next": "question", "response": "Hi"}', False),
+        ('Sure! {"next": "question", "response": "Hi"} Let me know.', True),
+        ('{"next": "question", "response": "Hi",}', True),
+        ("{'next': 'question', 'response': 'Hi', 'args': {'city': None}}", True),
+        ('{"next": "question", "response": "Hi", "args": {"city": null', True),
+        ('I can\'t do {that}. {"next": "question", "response": "Hi"}', True),
+        ('I can\'t do {"that}. {"next": "question", "response": "Hi"}', True),
+    ]
+    for text, repaired in cases:
+        data, was_repaired = parse_json_tolerant(text)
+        assert data["next"] == "question" and data["response"] == "Hi", (text, data)
+        assert was_repaired == repaired, text
+        print(f"{text!r}: {data}")
+
+    for text in ("no json here", "only {prose} in braces"):
+        try:
+            parse_json_tolerant(text)
+        except ValueError as e:
+            print(f"{text!r}: {e}")
+        else:
+            raise AssertionError(text)
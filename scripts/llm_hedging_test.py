@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import litellm
+
+from activities.llm_client import LLMBackend, LLMClient, fake_backend
+from activities.llm_routing import LLMRoute
+
+# Exercises hedging and circuit breaking offline against fake LLM backends.
+
+if __name__ == "__main__":
+
+    async def main():
+        slow_primary = fake_backend("fake/slow-primary", latency=2.0)
+        fast_secondary = fake_backend("fake/fast-secondary", latency=0.1)
+        client = LLMClient(
+            fallbacks=[slow_primary, fast_secondary],
+            default_hedge_delay=0.5,
+            failure_threshold=3,
+        )
+
+        # The primary is slower than the hedge delay, so the secondary answers
+        for _ in range(3):
+            answered_by = []
+            response = await client.complete(
+                LLMRoute(model=slow_primary.model),
+                {"messages": []},
+                on_answer=answered_by.append,
+            )
+            print(f"answered by {response.model}")
+            assert answered_by == [fast_secondary]
+
+        # A failing primary trips its circuit and is skipped afterwards
+        failing_primary = fake_backend("fake/failing-primary", failure_rate=1.0)
+        client.fallbacks = [failing_primary, fast_secondary]
+        for _ in range(5):
+            response = await client.complete(
+                LLMRoute(model=failing_primary.model), {"messages": []}
+            )
+            print(f"answered by {response.model}")
+
+        print(json.dumps(client.stats(), indent=2))
+
+        # After the cooldown only one request at a time probes the failing primary
+        slow_failing = fake_backend("fake/slow-failing", latency=0.5, failure_rate=1.0)
+        client = LLMClient(
+            fallbacks=[slow_failing, fast_secondary],
+            hedge=False,
+            failure_threshold=1,
+            cooldown_seconds=0.2,
+        )
+        await client.complete(LLMRoute(model=slow_failing.model), {"messages": []})
+        await asyncio.sleep(0.3)
+        await asyncio.gather(
+            *(
+                client.complete(LLMRoute(model=slow_failing.model), {"messages": []})
+                for _ in range(5)
+            )
+        )
+        probes = client.health_of(slow_failing).requests - 1
+        print(f"half-open probes: {probes}")
+        assert probes == 1
+
+        # Bad requests are not the backend's fault and leave its circuit closed
+        async def bad_request(**kwargs):
+            raise litellm.BadRequestError("bad request", "fake/rejecting", "fake")
+
+        rejecting = LLMBackend(model="fake/rejecting", completion=bad_request)
+        client = LLMClient(fallbacks=[rejecting, fast_secondary], failure_threshold=1)
+        for _ in range(3):
+            await client.complete(LLMRoute(model=rejecting.model), {"messages": []})
+        health = client.health_of(rejecting)
+        print(f"rejected requests: {health.requests}, failures: {health.failures}")
+        assert health.requests == 3 and health.available()
+
+        # A fallback gets a request built for its own model
+        requested = {}
+
+        async def recording_completion(**kwargs):
+            requested.update(kwargs)
+            return await fast_secondary.completion(**kwargs)
+
+        anthropic_fallback = LLMBackend(
+            model="anthropic/fake-fallback", completion=recording_completion
+        )
+        client = LLMClient(fallbacks=[failing_primary, anthropic_fallback])
+        await client.complete(
+            LLMRoute(model=failing_primary.model),
+            {
+                "model": failing_primary.model,
+                "response_format": {"type": "json_object"},
+            },
+            request_for=lambda model: {"model": model, "built_for": model},
+        )
+        print(f"fallback request: {requested}")
+        assert requested["built_for"] == anthropic_fallback.model
+        assert "response_format" not in requested
+
+        # Hedged calls wait for a slot under max_concurrency like any other call
+        queue_waits = []
+        client = LLMClient(
+            fallbacks=[slow_primary, fast_secondary],
+            default_hedge_delay=0.2,
+            max_concurrency=1,
+        )
+        await client.complete(
+            LLMRoute(model=slow_primary.model),
+            {"messages": []},
+            on_queue_wait=queue_waits.append,
+        )
+        print(f"queue waits with one slot: {[round(w, 2) for w in queue_waits]}")
+        assert max(queue_waits) > 1
+
+    asyncio.run(main())
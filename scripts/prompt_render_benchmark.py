@@ -0,0 +1,38 @@
+import json
+import timeit
+
+from prompts.history_window import SerializedHistory
+
+# Compares re-serializing the whole conversation history every turn with joining
+# the per-message JSON that SerializedHistory caches as messages are added.
+
+if __name__ == "__main__":
+
+    def make_message(i: int) -> dict:
+        if i % 3 == 0:
+            return {"actor": "user", "response": f"Let's go to Melbourne in May ({i})"}
+        return {
+            "actor": "agent",
+            "response": {
+                "next": "question",
+                "tool": "FindEvents",
+                "args": {"city": "Melbourne", "month": None},
+                "response": "Which month would you like to search for events in? " * 3,
+            },
+        }
+
+    for size in (10, 100, 250):
+        history = {"messages": [make_message(i) for i in range(size)]}
+        serialized = SerializedHistory()
+        for message in history["messages"]:
+            serialized.append(message)
+        assert serialized.render(history)[0] == json.dumps(history, indent=2)
+
+        runs = 200
+        full = timeit.timeit(lambda: json.dumps(history, indent=2), number=runs)
+        cached = timeit.timeit(lambda: serialized.render(history), number=runs)
+        print(
+            f"{size:>4} messages: full dump {full / runs * 1e6:8.1f}us, "
+            f"cached fragments {cached / runs * 1e6:8.1f}us "
+            f"({full / cached:.1f}x)"
+        )
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import uuid
+from collections import deque
+
+from temporalio import activity
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import UnsandboxedWorkflowRunner, Worker
+
+import api.main
+from models.requests import (
+    AgentGoalWorkflowParams,
+    CombinedInput,
+    EnvLookupInput,
+    EnvLookupOutput,
+    ToolPromptInput,
+    ValidationInput,
+    ValidationResult,
+)
+from tools.goal_registry import goal_event_flight_invoice
+from workflows import agent_goal_workflow
+from workflows.agent_goal_workflow import AgentGoalWorkflow
+
+# Streams a conversation through /stream-conversation across a continue-as-new,
+# against Temporal's test server with fake LLM activities.
+
+TASK_QUEUE = "stream-conversation-test"
+
+
+@activity.defn(name="get_wf_env_vars")
+async def fake_env_vars(input: EnvLookupInput) -> EnvLookupOutput:
+    return EnvLookupOutput(show_confirm=False)
+
+
+@activity.defn(name="agent_validatePrompt")
+async def fake_validate(input: ValidationInput) -> ValidationResult:
+    return ValidationResult(validationResult=True)
+
+
+@activity.defn(name="agent_toolPlanner")
+async def fake_planner(input: ToolPromptInput) -> dict:
+    if input.call_site == "summarize":
+        return {"summary": "The user asked a few questions."}
+    return {"next": "question", "response": f"You said: {input.prompt}"}
+
+
+async def read_stream(workflow_id: str) -> list:
+    """Applies each streamed delta the way the frontend does; returns the result."""
+    response = await api.main.stream_conversation(workflow_id)
+    messages = []
+    async for event in response.body_iterator:
+        if event.startswith("data: "):
+            delta = json.loads(event[len("data: ") :])
+            messages = messages[: delta["offset"]] + delta["messages"]
+    return messages
+
+
+if __name__ == "__main__":
+
+    async def main():
+        # Small enough that the second prompt triggers a continue-as-new
+        agent_goal_workflow.MAX_TURNS_BEFORE_CONTINUE = 4
+
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            api.main.temporal_client = env.client
+            async with Worker(
+                env.client,
+                task_queue=TASK_QUEUE,
+                workflows=[AgentGoalWorkflow],
+                activities=[fake_env_vars, fake_validate, fake_planner],
+                # The module-level turn limit above must be visible to the workflow
+                workflow_runner=UnsandboxedWorkflowRunner(),
+            ):
+                workflow_id = f"stream-test-{uuid.uuid4()}"
+                handle = await env.client.start_workflow(
+                    AgentGoalWorkflow.run,
+                    CombinedInput(
+                        agent_goal=goal_event_flight_invoice,
+                        tool_params=AgentGoalWorkflowParams(None, deque()),
+                    ),
+                    id=workflow_id,
+                    task_queue=TASK_QUEUE,
+                )
+                stream = asyncio.create_task(read_stream(workflow_id))
+
+                for prompt in ("first", "second"):
+                    await handle.signal(AgentGoalWorkflow.user_prompt, prompt)
+                    await asyncio.sleep(1)
+
+                # The first run ended with a summary; the stream must follow the new run
+                new_run = env.client.get_workflow_handle(workflow_id)
+                await new_run.signal(AgentGoalWorkflow.user_prompt, "third")
+                await asyncio.sleep(1)
+                expected = await new_run.query(
+                    AgentGoalWorkflow.get_conversation_history
+                )
+                await new_run.signal(AgentGoalWorkflow.end_chat)
+
+                streamed = await asyncio.wait_for(stream, timeout=30)
+                assert (await new_run.describe()).run_id != handle.result_run_id
+                assert streamed == expected["messages"], streamed
+                assert [m["response"] for m in streamed if m["actor"] == "user"] == [
+                    "third"
+                ]
+                print("stream followed the conversation across continue-as-new")
+
+    asyncio.run(main())
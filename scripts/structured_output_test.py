@@ -0,0 +1,47 @@
+import os
+
+from activities.structured_output import (
+    detect_structured_output_mode,
+    response_format,
+)
+from workflows.workflow_helpers import prompt_summary_with_history
+
+# Checks which requests get a response_format, including the continue-as-new summary.
+
+
+def messages_for(context_instructions: str, prompt: str) -> list:
+    return [
+        {"role": "system", "content": context_instructions},
+        {"role": "user", "content": prompt},
+    ]
+
+
+if __name__ == "__main__":
+    os.environ.pop("LLM_STRUCTURED_OUTPUT", None)
+    os.environ.pop("LLM_JSON_MODE_MODELS", None)
+
+    # Listing response_format as a supported param is not enough for JSON mode
+    assert detect_structured_output_mode("openai/gpt-4o") == "json_schema"
+    assert detect_structured_output_mode("openai/gpt-4") == "off"
+    os.environ["LLM_JSON_MODE_MODELS"] = "openai/gpt-4"
+    assert detect_structured_output_mode("openai/gpt-4") == "json_object"
+
+    # OpenAI rejects JSON mode unless the messages mention JSON
+    summary = messages_for(
+        *prompt_summary_with_history(
+            {"messages": [{"actor": "user", "response": "hi"}]}
+        )
+    )
+    assert response_format("json_schema", False, summary) == {"type": "json_object"}
+    assert response_format("json_object", False, summary) == {"type": "json_object"}
+    no_json = messages_for(
+        "Here is the conversation history: hi",
+        'Put the summary in the format { "summary": "<plain text>" }',
+    )
+    assert response_format("json_schema", False, no_json) is None
+    assert response_format("json_object", False, no_json) is None
+
+    # Planner calls are schema-constrained whatever the prompt says
+    assert response_format("json_schema", True, no_json)["type"] == "json_schema"
+    assert response_format("off", True, summary) is None
+    print("structured output requests ok")
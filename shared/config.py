@@ -1,7 +1,9 @@
 import os
+from typing import Any, List, Optional
 
 from dotenv import load_dotenv
 from temporalio.client import Client
+from temporalio.runtime import Runtime
 from temporalio.service import TLSConfig
 
 load_dotenv(override=True)
@@ -17,10 +19,14 @@ TEMPORAL_TLS_KEY = os.getenv("TEMPORAL_TLS_KEY", "")
 TEMPORAL_API_KEY = os.getenv("TEMPORAL_API_KEY", "")
 
 
-async def get_temporal_client() -> Client:
+async def get_temporal_client(
+    runtime: Optional[Runtime] = None, interceptors: Optional[List[Any]] = None
+) -> Client:
     """
     Creates a Temporal client based on environment configuration.
     Supports local server, mTLS, and API key authentication methods.
+    The runtime, if given, carries telemetry settings such as metrics export;
+    interceptors (e.g. from shared.tracing.setup_tracing) also apply to workers.
     """
     # Default to no TLS for local development
     tls_config = False
@@ -48,6 +54,8 @@ async def get_temporal_client() -> Client:
             namespace=TEMPORAL_NAMESPACE,
             api_key=TEMPORAL_API_KEY,
             tls=True,  # Always use TLS with API key
+            runtime=runtime,
+            interceptors=interceptors or [],
         )
 
     # Use mTLS or local connection
@@ -55,4 +63,6 @@ async def get_temporal_client() -> Client:
         TEMPORAL_ADDRESS,
         namespace=TEMPORAL_NAMESPACE,
         tls=tls_config,
+        runtime=runtime,
+        interceptors=interceptors or [],
     )
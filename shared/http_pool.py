@@ -0,0 +1,133 @@
+import importlib.util
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+# HTTP/2 needs the optional h2 package; without it clients fall back to HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class _ConnectTrace:
+    """httpcore trace callback that notes whether a request opened a new connection."""
+
+    def __init__(self) -> None:
+        self.connect_started: Optional[float] = None
+        self.connect_seconds: Optional[float] = None
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.started":
+            self.connect_started = time.monotonic()
+        elif event_name in (
+            "connection.connect_tcp.complete",
+            "connection.start_tls.complete",
+        ):
+            # TLS completes after TCP, so the last event seen covers the whole handshake
+            if self.connect_started is not None:
+                self.connect_seconds = time.monotonic() - self.connect_started
+
+
+class HTTPPool:
+    """
+    A worker-scoped async HTTP connection pool with keep-alive and HTTP/2 where
+    available. The client is shared by LiteLLM and async tools such as
+    SearchFlights, so repeated calls to the same host skip TCP and TLS setup.
+
+    Every response is counted as served over a new or a reused connection, along
+    with the time spent connecting, so stats() can report the reuse ratio.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        timeout: float = 30.0,
+    ) -> None:
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.timeout = httpx.Timeout(timeout)
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self.responses = 0
+        self.new_connections = 0
+        self.connect_seconds_total = 0.0
+        self.connect_seconds_max = 0.0
+
+    @classmethod
+    def from_env(cls) -> "HTTPPool":
+        return cls(
+            max_connections=int(os.environ.get("HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(
+                os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")
+            ),
+            keepalive_expiry=float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "30")),
+            http2=os.environ.get("HTTP2_ENABLED", "true").lower() == "true",
+            timeout=float(os.environ.get("HTTP_TIMEOUT", "30")),
+        )
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # Created and used on the worker's event loop only, so no locking is needed
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                limits=self.limits,
+                http2=self.http2,
+                timeout=self.timeout,
+                follow_redirects=True,
+                event_hooks={
+                    "request": [self._trace_request],
+                    "response": [self._record_response],
+                },
+            )
+        return self._async_client
+
+    async def _trace_request(self, request: httpx.Request) -> None:
+        request.extensions["trace"] = _ConnectTrace()
+
+    async def _record_response(self, response: httpx.Response) -> None:
+        trace = response.request.extensions.get("trace")
+        connect_seconds = getattr(trace, "connect_seconds", None)
+        self.responses += 1
+        if connect_seconds is not None:
+            self.new_connections += 1
+            self.connect_seconds_total += connect_seconds
+            self.connect_seconds_max = max(self.connect_seconds_max, connect_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        reused = self.responses - self.new_connections
+        return {
+            "http2": self.http2,
+            "responses": self.responses,
+            "new_connections": self.new_connections,
+            "reuse_ratio": reused / self.responses if self.responses else None,
+            "connect_seconds_avg": (
+                self.connect_seconds_total / self.new_connections
+                if self.new_connections
+                else None
+            ),
+            "connect_seconds_max": self.connect_seconds_max,
+        }
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+
+
+_pool: Optional[HTTPPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_http_pool() -> HTTPPool:
+    """The process-wide pool, created from the HTTP_* environment settings on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HTTPPool.from_env()
+        return _pool
@@ -0,0 +1,94 @@
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+# OpenTelemetry is optional: without it (or without any exporter configured)
+# tracing is off and the helpers below do nothing.
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+TRACES_FILE = os.getenv("OTEL_TRACES_FILE", "")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+
+
+def setup_tracing(service_name: str) -> List[Any]:
+    """
+    Configures OpenTelemetry tracing for this process and returns the Temporal
+    interceptors that propagate spans through workflows and activities. Pass them
+    to get_temporal_client(); workers built from that client pick them up.
+
+    Spans go to OTEL_TRACES_FILE (one JSON span per line) and/or an OTLP/HTTP
+    collector at OTEL_EXPORTER_OTLP_ENDPOINT. With neither set, nothing is traced.
+    """
+    if not (TRACES_FILE or OTLP_ENDPOINT):
+        return []
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            ConsoleSpanExporter,
+        )
+        from temporalio.contrib.opentelemetry import TracingInterceptor
+    except ImportError:
+        print(
+            'Tracing disabled: install the tracing extra (pip install -e ".[tracing]")'
+        )
+        return []
+
+    class FileSpanExporter(ConsoleSpanExporter):
+        """Appends one JSON span per line to a file, closed when tracing shuts down."""
+
+        def __init__(self, path: str) -> None:
+            self.file = open(path, "a")
+            super().__init__(
+                out=self.file,
+                formatter=lambda span: span.to_json(indent=None) + "\n",
+            )
+
+        def shutdown(self) -> None:
+            # Called by the span processor after its final flush, at process exit
+            super().shutdown()
+            self.file.close()
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    if TRACES_FILE:
+        provider.add_span_processor(BatchSpanProcessor(FileSpanExporter(TRACES_FILE)))
+        print(f"Writing traces to {TRACES_FILE}")
+    if OTLP_ENDPOINT:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError:
+            print(
+                "OTLP export disabled: install opentelemetry-exporter-otlp-proto-http"
+            )
+        else:
+            # The exporter reads OTEL_EXPORTER_OTLP_ENDPOINT itself
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+            print(f"Exporting traces to {OTLP_ENDPOINT}")
+    trace.set_tracer_provider(provider)
+    return [TracingInterceptor()]
+
+
+@contextmanager
+def start_span(name: str, attributes: Dict[str, Any]) -> Iterator[None]:
+    """A span around a block of code, e.g. an API request; no-op without OpenTelemetry."""
+    if trace is None:
+        yield
+        return
+    with trace.get_tracer(__name__).start_as_current_span(name, attributes=attributes):
+        yield
+
+
+def set_span_attributes(attributes: Dict[str, Any]) -> None:
+    """Adds attributes to the current span (e.g. an activity's); None values are skipped."""
+    if trace is None:
+        return
+    span = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            span.set_attribute(key, value)
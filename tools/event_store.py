@@ -0,0 +1,362 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from tools.search_index import NAME_WEIGHT, BM25Index, tokenize
+
+DEFAULT_EVENTS_PATH = Path(__file__).resolve().parent / "data" / "find_events_data.json"
+DEFAULT_EVENTS_DB_PATH = Path(__file__).resolve().parent / "data" / "find_events.db"
+
+# A lookup: a city substring ("" for all cities) and the months to match
+EventQuery = Tuple[str, Iterable[int]]
+
+
+@dataclass(frozen=True)
+class Event:
+    position: int  # order in the catalog, so results keep the file's order
+    city: str
+    event_name: str
+    date_from: date
+    date_to: date
+    description: str
+
+
+class EventStore:
+    """
+    In-memory event catalog, loaded from a JSON file of {city: [event, ...]}.
+
+    Dates are parsed once at load time and events are indexed by city and by the
+    months they start and end in, so a lookup only touches matching events. A
+    BM25 index over event names and descriptions serves keyword searches. The
+    file is reloaded when its modification time changes.
+    """
+
+    def __init__(self, path: Path = DEFAULT_EVENTS_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime_ns: Optional[int] = None
+        # city -> month -> events starting or ending in that month
+        self._index: Dict[str, Dict[int, List[Event]]] = {}
+        self._search_index = BM25Index([])
+
+    def _refresh(self) -> None:
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        if mtime_ns == self._mtime_ns:
+            return
+        with self._lock:
+            if mtime_ns == self._mtime_ns:
+                return
+            with open(self.path) as f:
+                data = json.load(f)
+            index: Dict[str, Dict[int, List[Event]]] = {}
+            documents = []
+            position = 0
+            for city, events in data.items():
+                by_month: Dict[int, List[Event]] = defaultdict(list)
+                for raw in events:
+                    event = Event(
+                        position=position,
+                        city=city,
+                        event_name=raw["eventName"],
+                        date_from=date.fromisoformat(raw["dateFrom"]),
+                        date_to=date.fromisoformat(raw["dateTo"]),
+                        description=raw["description"],
+                    )
+                    position += 1
+                    documents.append(
+                        (event.position, event.event_name, event.description)
+                    )
+                    by_month[event.date_from.month].append(event)
+                    if event.date_to.month != event.date_from.month:
+                        by_month[event.date_to.month].append(event)
+                index[city] = dict(by_month)
+            # Swapped together, so lookups always see a matching pair
+            self._index, self._search_index = index, BM25Index(documents)
+            self._mtime_ns = mtime_ns
+
+    def city_names(self) -> List[str]:
+        """The catalog's city names, in catalog order."""
+        self._refresh()
+        return list(self._index)
+
+    def events_in_months(self, city: str, months: Iterable[int]) -> List[Event]:
+        """
+        Events in cities whose name contains city (case-insensitive; all cities if
+        empty) that start or end in one of the months, in catalog order.
+        """
+        return self.events_in_months_batch([(city, months)])[0]
+
+    def events_in_months_batch(
+        self, queries: Sequence[EventQuery]
+    ) -> List[List[Event]]:
+        """events_in_months for several queries, answered in one pass over the index."""
+        self._refresh()
+        return self._events_in_months(self._index, queries)
+
+    def search(
+        self, city: str, months: Iterable[int], query: str, limit: int
+    ) -> List[Event]:
+        """
+        The events_in_months matches that contain a query term, best BM25 match
+        first (ties in catalog order), at most limit of them.
+        """
+        return self.search_batch([(city, months)], query, limit)[0]
+
+    def search_batch(
+        self, queries: Sequence[EventQuery], query: str, limit: int
+    ) -> List[List[Event]]:
+        """search for several city/month queries sharing one keyword query."""
+        self._refresh()
+        index, search_index = self._index, self._search_index
+        results = []
+        for events in self._events_in_months(index, queries):
+            scores = search_index.search(query, {event.position for event in events})
+            ranked = sorted(
+                (event for event in events if event.position in scores),
+                key=lambda event: -scores[event.position],
+            )
+            results.append(ranked[:limit])
+        return results
+
+    @staticmethod
+    def _events_in_months(
+        index: Dict[str, Dict[int, List[Event]]], queries: Sequence[EventQuery]
+    ) -> List[List[Event]]:
+        lookups = [(city.lower(), list(months)) for city, months in queries]
+        matches: List[Dict[int, Event]] = [{} for _ in lookups]
+        # Each city's index is visited once, however many queries there are
+        for city_name, by_month in index.items():
+            city_name = city_name.lower()
+            for (city, months), found in zip(lookups, matches):
+                if city and city not in city_name:
+                    continue
+                for month in months:
+                    for event in by_month.get(month, ()):
+                        found[event.position] = event
+        return [[found[position] for position in sorted(found)] for found in matches]
+
+
+class SQLiteEventStore:
+    """
+    Event catalog in an indexed SQLite file built by import_events, for catalogs
+    too large to hold in every worker's memory. City and month filters run in
+    SQL against indexes on (city, start month) and (city, end month).
+    """
+
+    def __init__(self, path: Path = DEFAULT_EVENTS_DB_PATH) -> None:
+        self.path = path
+        # sqlite3 connections can't be shared across threads, and tools run in threads
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # A re-import swaps in a new file; reconnect to pick it up
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        if getattr(self._local, "mtime_ns", None) != mtime_ns:
+            if getattr(self._local, "connection", None) is not None:
+                self._local.connection.close()
+            self._local.connection = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True
+            )
+            self._local.mtime_ns = mtime_ns
+        return self._local.connection
+
+    def city_names(self) -> List[str]:
+        return [
+            name for (name,) in self._connection().execute("SELECT name FROM cities")
+        ]
+
+    def events_in_months(self, city: str, months: Iterable[int]) -> List[Event]:
+        """Same contract as EventStore.events_in_months."""
+        return self._select(city, months)
+
+    def events_in_months_batch(
+        self, queries: Sequence[EventQuery]
+    ) -> List[List[Event]]:
+        # Each query is an indexed lookup rather than a scan, so there is nothing to share
+        return [self._select(city, months) for city, months in queries]
+
+    def search(
+        self, city: str, months: Iterable[int], query: str, limit: int
+    ) -> List[Event]:
+        """Same contract as EventStore.search, scored by SQLite FTS5's bm25()."""
+        return self.search_batch([(city, months)], query, limit)[0]
+
+    def search_batch(
+        self, queries: Sequence[EventQuery], query: str, limit: int
+    ) -> List[List[Event]]:
+        terms = tokenize(query)
+        if not terms:
+            return [[] for _ in queries]
+        return [self._select(city, months, terms, limit) for city, months in queries]
+
+    def _select(
+        self,
+        city: str,
+        months: Iterable[int],
+        terms: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Event]:
+        connection = self._connection()
+        months = list(months)
+        where = ""
+        params: List[Union[int, str]] = []
+        if city:
+            # Substring match on the (small) city table, then indexed lookups by name
+            cities = [
+                name
+                for (name,) in connection.execute(
+                    "SELECT name FROM cities WHERE instr(lower(name), ?) > 0",
+                    (city.lower(),),
+                )
+            ]
+            if not cities:
+                return []
+            where = f"city IN ({','.join('?' * len(cities))}) AND "
+            params = cities
+        month_params = ",".join("?" * len(months))
+        columns = "position, city, event_name, date_from, date_to, description"
+        # One indexed lookup per month column; UNION drops events matched by both
+        sql = (
+            f"SELECT {columns} FROM events "
+            f"WHERE {where}month_from IN ({month_params}) "
+            f"UNION SELECT {columns} FROM events "
+            f"WHERE {where}month_to IN ({month_params}) "
+        )
+        params = params + months + params + months
+        if terms is None:
+            rows = connection.execute(sql + "ORDER BY position", params)
+        else:
+            # Any query term matches; bm25() is lower for better matches
+            rows = connection.execute(
+                "SELECT matches.* FROM (" + sql + ") AS matches "
+                "JOIN events_fts ON events_fts.rowid = matches.position "
+                "WHERE events_fts MATCH ? "
+                f"ORDER BY bm25(events_fts, {NAME_WEIGHT}.0, 1.0), matches.position "
+                "LIMIT ?",
+                params + [" OR ".join(f'"{term}"' for term in terms), limit],
+            )
+        return [
+            Event(
+                position=position,
+                city=city_name,
+                event_name=event_name,
+                date_from=date.fromisoformat(date_from),
+                date_to=date.fromisoformat(date_to),
+                description=description,
+            )
+            for position, city_name, event_name, date_from, date_to, description in rows
+        ]
+
+
+def _read_events(source: Path) -> Iterator[Tuple[str, dict]]:
+    """(city, event) pairs from a {city: [event, ...]} JSON file, or from a JSON
+    Lines feed with one event per line carrying its own "city"."""
+    if source.suffix == ".jsonl":
+        with open(source) as f:
+            for line in f:
+                if line.strip():
+                    event = json.loads(line)
+                    yield event["city"], event
+        return
+    with open(source) as f:
+        data = json.load(f)
+    for city, events in data.items():
+        for event in events:
+            yield city, event
+
+
+def import_events(source: Path, db_path: Path) -> int:
+    """
+    Builds (or replaces) an SQLite event catalog from a JSON catalog or JSON
+    Lines feed. Returns the number of events imported.
+    """
+    tmp_path = Path(f"{db_path}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.execute(
+            "CREATE TABLE events ("
+            "position INTEGER PRIMARY KEY, city TEXT NOT NULL, "
+            "event_name TEXT NOT NULL, date_from TEXT NOT NULL, date_to TEXT NOT NULL, "
+            "month_from INTEGER NOT NULL, month_to INTEGER NOT NULL, "
+            "description TEXT NOT NULL)"
+        )
+        connection.execute("CREATE TABLE cities (name TEXT PRIMARY KEY)")
+        connection.execute(
+            "CREATE VIRTUAL TABLE events_fts USING fts5("
+            "event_name, description, content='events', content_rowid='position', "
+            "tokenize='porter')"
+        )
+        count = 0
+
+        def rows() -> Iterator[Tuple[Union[int, str], ...]]:
+            nonlocal count
+            for city, event in _read_events(source):
+                date_from = date.fromisoformat(event["dateFrom"])
+                date_to = date.fromisoformat(event["dateTo"])
+                yield (
+                    count,
+                    city,
+                    event["eventName"],
+                    date_from.isoformat(),
+                    date_to.isoformat(),
+                    date_from.month,
+                    date_to.month,
+                    event["description"],
+                )
+                count += 1
+
+        with connection:
+            connection.executemany(
+                "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows()
+            )
+            connection.execute(
+                "INSERT INTO cities SELECT DISTINCT city FROM events ORDER BY city"
+            )
+            connection.execute(
+                "INSERT INTO events_fts (rowid, event_name, description) "
+                "SELECT position, event_name, description FROM events"
+            )
+            # Indexes are cheaper to build once the rows are in
+            connection.execute(
+                "CREATE INDEX events_city_month_from ON events (city, month_from)"
+            )
+            connection.execute(
+                "CREATE INDEX events_city_month_to ON events (city, month_to)"
+            )
+            connection.execute("CREATE INDEX events_month_from ON events (month_from)")
+            connection.execute("CREATE INDEX events_month_to ON events (month_to)")
+    finally:
+        connection.close()
+    # Swap the finished file in so readers never see a half-built catalog
+    os.replace(tmp_path, db_path)
+    return count
+
+
+_stores: Dict[Path, Union[EventStore, SQLiteEventStore]] = {}
+_stores_lock = threading.Lock()
+
+
+def get_event_store() -> Union[EventStore, SQLiteEventStore]:
+    """
+    The worker-wide event store, shared across tool calls and threads.
+    FIND_EVENTS_BACKEND picks "json" (default, in memory) or "sqlite", which reads
+    FIND_EVENTS_DB_PATH as built by scripts/import_events.py.
+    """
+    backend = os.getenv("FIND_EVENTS_BACKEND", "json").lower()
+    with _stores_lock:
+        if backend == "sqlite":
+            path = Path(os.getenv("FIND_EVENTS_DB_PATH", str(DEFAULT_EVENTS_DB_PATH)))
+            if path not in _stores:
+                _stores[path] = SQLiteEventStore(path)
+        else:
+            path = DEFAULT_EVENTS_PATH
+            if path not in _stores:
+                _stores[path] = EventStore(path)
+        return _stores[path]
@@ -1,73 +1,137 @@
-import json
 from datetime import date, datetime
-from pathlib import Path
+from typing import List, Optional
 
+from tools.event_store import Event, get_event_store
 
-def find_events(args: dict) -> dict:
-    search_city = args.get("city", "").lower()
-    search_month = args.get("month", "").capitalize()
+# Most events returned for a keyword query, best matches first
+MAX_QUERY_RESULTS = 10
 
-    file_path = Path(__file__).resolve().parent / "data" / "find_events_data.json"
-    if not file_path.exists():
-        return {"error": "Data file not found."}
 
+# Helper to wrap months into [1..12]
+def get_adjacent_months(m):
+    prev_m = 12 if m == 1 else (m - 1)
+    next_m = 1 if m == 12 else (m + 1)
+    return [prev_m, m, next_m]
+
+
+def parse_month(month: str) -> Optional[int]:
     try:
-        month_number = datetime.strptime(search_month, "%B").month
+        return datetime.strptime(month.capitalize(), "%B").month
     except ValueError:
-        return {"error": "Invalid month provided."}
+        return None
 
-    # Helper to wrap months into [1..12]
-    def get_adjacent_months(m):
-        prev_m = 12 if m == 1 else (m - 1)
-        next_m = 1 if m == 12 else (m + 1)
-        return [prev_m, m, next_m]
 
+def format_events(events: List[Event], search_month: str, query: str) -> dict:
+    month_number = parse_month(search_month)
     valid_months = get_adjacent_months(month_number)
     current_date = date.today()
 
     matching_events = []
-    with open(file_path) as f:
-        data = json.load(f)
-    for city_name, events in data.items():
-        if search_city and search_city not in city_name.lower():
-            continue
-
-        for event in events:
-            date_from = datetime.strptime(event["dateFrom"], "%Y-%m-%d").date()
-            date_to = datetime.strptime(event["dateTo"], "%Y-%m-%d").date()
-
-            # Check if event has already passed and adjust year if needed
-            if date_from < current_date:
-                # Increment year by 1 for both dates
-                date_from = date_from.replace(year=current_date.year + 1)
-                date_to = date_to.replace(year=current_date.year + 1)
-
-            # If the event's start or end month is in our valid months
-            if date_from.month in valid_months or date_to.month in valid_months:
-                # Add metadata explaining how it matches
-                if date_from.month == month_number or date_to.month == month_number:
-                    month_context = "requested month"
-                elif (
-                    date_from.month == valid_months[0]
-                    or date_to.month == valid_months[0]
-                ):
-                    month_context = "previous month"
-                else:
-                    month_context = "next month"
-
-                matching_events.append(
-                    {
-                        "city": city_name,
-                        "eventName": event["eventName"],
-                        "dateFrom": date_from.strftime("%Y-%m-%d"),
-                        "dateTo": date_to.strftime("%Y-%m-%d"),
-                        "description": event["description"],
-                        "month": month_context,
-                    }
-                )
+    for event in events:
+        date_from = event.date_from
+        date_to = event.date_to
+
+        # Check if event has already passed and adjust year if needed
+        if date_from < current_date:
+            # Increment year by 1 for both dates
+            date_from = date_from.replace(year=current_date.year + 1)
+            date_to = date_to.replace(year=current_date.year + 1)
 
+        # Add metadata explaining how it matches
+        if date_from.month == month_number or date_to.month == month_number:
+            month_context = "requested month"
+        elif date_from.month == valid_months[0] or date_to.month == valid_months[0]:
+            month_context = "previous month"
+        else:
+            month_context = "next month"
+
+        matching_events.append(
+            {
+                "city": event.city,
+                "eventName": event.event_name,
+                "dateFrom": date_from.strftime("%Y-%m-%d"),
+                "dateTo": date_to.strftime("%Y-%m-%d"),
+                "description": event.description,
+                "month": month_context,
+            }
+        )
+
+    search_month = search_month.capitalize()
     # Add top-level metadata if you wish
+    if query:
+        return {
+            "note": f"Returning up to {MAX_QUERY_RESULTS} events best matching '{query}' from {search_month} plus one month either side.",
+            "events": matching_events,
+        }
     return {
         "note": f"Returning events from {search_month} plus one month either side (i.e., {', '.join(datetime(2025, m, 1).strftime('%B') for m in valid_months)}).",
         "events": matching_events,
     }
+
+
+def invalid_arguments(args: dict) -> Optional[str]:
+    """Why the (LLM-produced) arguments can't be used, or None if they can."""
+    if not isinstance(args.get("query") or "", str):
+        return "query must be a string."
+    queries = args.get("queries")
+    if queries is None:
+        searches = [args]
+    elif isinstance(queries, list) and all(isinstance(q, dict) for q in queries):
+        searches = queries
+    else:
+        return 'queries must be a list of {"city": ..., "month": ...} objects.'
+    for search in searches:
+        for key in ("city", "month"):
+            if not isinstance(search.get(key) or "", str):
+                return f"{key} must be a string."
+    return None
+
+
+def find_events(args: dict) -> dict:
+    """
+    Finds events for a city and month, or for each of a list of "queries"
+    ({"city", "month"} pairs) at once; the batch is answered in one pass over the
+    event catalog and results come back grouped per query.
+    """
+    error = invalid_arguments(args)
+    if error is not None:
+        return {"error": error}
+
+    query = (args.get("query") or "").strip()
+    queries = args.get("queries") or [
+        {"city": args.get("city", ""), "month": args.get("month", "")}
+    ]
+
+    store = get_event_store()
+    if not store.path.exists():
+        return {"error": "Data file not found."}
+
+    lookups = []
+    for search in queries:
+        month_number = parse_month(search.get("month") or "")
+        if month_number is not None:
+            lookups.append(
+                ((search.get("city") or "").lower(), get_adjacent_months(month_number))
+            )
+    if query:
+        found = store.search_batch(lookups, query, MAX_QUERY_RESULTS)
+    else:
+        found = store.events_in_months_batch(lookups)
+
+    results = []
+    found_events = iter(found)
+    for search in queries:
+        search_month = search.get("month") or ""
+        if parse_month(search_month) is None:
+            results.append({"error": "Invalid month provided."})
+        else:
+            results.append(format_events(next(found_events), search_month, query))
+
+    if not args.get("queries"):
+        return results[0]
+    return {
+        "results": [
+            dict(city=search.get("city"), month=search.get("month"), **result)
+            for search, result in zip(queries, results)
+        ]
+    }
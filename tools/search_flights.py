@@ -1,15 +1,58 @@
+import asyncio
 import json
 import os
 import random
+from datetime import date
 
-import requests
+import httpx
 from dotenv import load_dotenv
 
+from shared.http_pool import get_http_pool
+from tools.ttl_cache import TTLCache
 
-def search_airport(query: str) -> list:
+# Explicit per-call timeouts; the airport lookup is small, the flight search is slow
+AIRPORT_LOOKUP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+FLIGHT_SEARCH_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+load_dotenv(override=True)
+
+# Airport codes practically never change; failed (empty) lookups aren't kept
+airport_cache = TTLCache(
+    "airports",
+    ttl_seconds=float(os.getenv("AIRPORT_CACHE_TTL_SECONDS", "86400")),
+    cache_if=bool,
+)
+# Fares move, so results go stale quickly but are still served while refreshing
+flight_cache = TTLCache(
+    "flights",
+    ttl_seconds=float(os.getenv("FLIGHT_CACHE_TTL_SECONDS", "600")),
+    stale_seconds=float(os.getenv("FLIGHT_CACHE_STALE_SECONDS", "3600")),
+    cache_if=lambda result: "results" in result,
+)
+
+
+def normalize_place(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def normalize_date(value: str) -> str:
+    try:
+        return date.fromisoformat(value.strip()).isoformat()
+    except (AttributeError, ValueError):
+        return str(value).strip()
+
+
+async def search_airport(query: str) -> list:
     """
-    Returns a list of matching airports/cities from sky-scrapper's searchAirport endpoint.
+    Returns a list of matching airports/cities from sky-scrapper's searchAirport
+    endpoint, cached by the normalized query.
     """
+    return await airport_cache.get(
+        normalize_place(query), lambda: _search_airport(query)
+    )
+
+
+async def _search_airport(query: str) -> list:
     load_dotenv(override=True)
     api_key = os.getenv("RAPIDAPI_KEY", "YOUR_DEFAULT_KEY")
     api_host = os.getenv("RAPIDAPI_HOST_FLIGHTS", "sky-scrapper.p.rapidapi.com")
@@ -25,14 +68,17 @@ def search_airport(query: str) -> list:
     params = {"query": query, "locale": "en-US"}
 
     try:
-        response = requests.get(url, headers=headers, params=params)
+        # Pooled client: lookups and searches to the same host reuse connections
+        response = await get_http_pool().async_client.get(
+            url, headers=headers, params=params, timeout=AIRPORT_LOOKUP_TIMEOUT
+        )
         if response.status_code != 200:
             print(f"Error: API responded with status code {response.status_code}")
             print(f"Response: {response.text}")
             return []
 
         return response.json().get("data", [])
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Request error: {e}")
         return []
     except json.JSONDecodeError:
@@ -41,11 +87,29 @@ def search_airport(query: str) -> list:
         return []
 
 
-def search_flights_real_api(
+async def search_flights_real_api(
     args: dict,
 ) -> dict:  # rename to search_flights to use the real API
     """
-    1) Looks up airport/city codes via search_airport.
+    Flight search through the real API, cached by normalized origin, destination
+    and dates.
+    """
+    key = (
+        normalize_place(args.get("origin", "")),
+        normalize_place(args.get("destination", "")),
+        normalize_date(args.get("dateDepart")),
+        normalize_date(args.get("dateReturn")),
+    )
+    result = await flight_cache.get(key, lambda: _search_flights_real_api(args))
+    print(
+        f"Flight cache: {flight_cache.stats()}, airport cache: {airport_cache.stats()}"
+    )
+    return result
+
+
+async def _search_flights_real_api(args: dict) -> dict:
+    """
+    1) Looks up airport/city codes via search_airport, origin and destination concurrently.
     2) Finds the first matching skyId/entityId for both origin & destination.
     3) Calls the flight search endpoint with those codes.
     """
@@ -55,8 +119,9 @@ def search_flights_real_api(
     dest_query = args.get("destination", "")
 
     # Step 1: Resolve skyIds
-    origin_candidates = search_airport(origin_query)
-    destination_candidates = search_airport(dest_query)
+    origin_candidates, destination_candidates = await asyncio.gather(
+        search_airport(origin_query), search_airport(dest_query)
+    )
 
     if not origin_candidates or not destination_candidates:
         return {"error": "No matches found for origin/destination"}
@@ -96,9 +161,11 @@ def search_flights_real_api(
     }
 
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = await get_http_pool().async_client.get(
+            url, headers=headers, params=params, timeout=FLIGHT_SEARCH_TIMEOUT
+        )
         json_data = response.json()
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         return {"error": f"Request error: {e}"}
     except json.JSONDecodeError:
         return {"error": "Invalid JSON response"}
@@ -407,7 +474,7 @@ def generate_smart_flights(origin: str, destination: str) -> list:
     return results
 
 
-def search_flights(args: dict) -> dict:
+async def search_flights(args: dict) -> dict:
     """
     Search for flights. Uses real API if RAPIDAPI_KEY is available, otherwise generates smart mock data.
     """
@@ -422,7 +489,7 @@ def search_flights(args: dict) -> dict:
 
     # If API key is available, use the real API
     if api_key and api_key != "YOUR_DEFAULT_KEY":
-        return search_flights_real_api(args)
+        return await search_flights_real_api(args)
 
     # Otherwise, generate smart mock data
     results = generate_smart_flights(origin, destination)
@@ -0,0 +1,93 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# BM25 parameters: term frequency saturation and document length normalization
+K1 = 1.2
+B = 0.75
+
+# Name matches count for more than description matches
+NAME_WEIGHT = 2
+
+STOPWORDS = {
+    "a",
+    "an",
+    "and",
+    "any",
+    "at",
+    "for",
+    "in",
+    "is",
+    "of",
+    "on",
+    "or",
+    "some",
+    "the",
+    "to",
+    "with",
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word: str) -> str:
+    # Just enough to match plurals: "festivals" -> "festival", "parties" -> "party"
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        _stem(word) for word in _WORD.findall(text.lower()) if word not in STOPWORDS
+    ]
+
+
+class BM25Index:
+    """
+    Inverted index over documents made of a name and a description, scored with
+    BM25. Name terms are counted NAME_WEIGHT times. Scoring only walks the
+    postings of the query's terms, so it costs O(matching postings).
+    """
+
+    def __init__(self, documents: Iterable[Tuple[int, str, str]]) -> None:
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.lengths: Dict[int, int] = {}
+        for doc_id, name, description in documents:
+            terms = tokenize(name) * NAME_WEIGHT + tokenize(description)
+            self.lengths[doc_id] = len(terms)
+            for term, count in Counter(terms).items():
+                self.postings[term][doc_id] = count
+        self.average_length = (
+            sum(self.lengths.values()) / len(self.lengths) if self.lengths else 0.0
+        )
+
+    def search(
+        self, query: str, candidates: Optional[Set[int]] = None
+    ) -> Dict[int, float]:
+        """BM25 scores of the documents (limited to candidates, if given) that
+        contain at least one query term."""
+        scores: Dict[int, float] = defaultdict(float)
+        total = len(self.lengths)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            if candidates is not None and len(candidates) < len(postings):
+                matches = [(d, postings[d]) for d in candidates if d in postings]
+            else:
+                matches = [
+                    (d, f)
+                    for d, f in postings.items()
+                    if candidates is None or d in candidates
+                ]
+            for doc_id, frequency in matches:
+                length_norm = 1 - B + B * self.lengths[doc_id] / self.average_length
+                scores[doc_id] += (
+                    idf * frequency * (K1 + 1) / (frequency + K1 * length_norm)
+                )
+        return scores
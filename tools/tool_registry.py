@@ -10,7 +10,9 @@ find_events_tool = ToolDefinition(
     description="Find upcoming events to travel to a given city (e.g., 'New York City') and a date or month. "
     "It knows about events in North America only (e.g. major North American cities). "
     "It will search 1 month either side of the month provided. "
-    "Returns a list of events. ",
+    "Returns a list of events. "
+    "If the user is flexible about cities or months, search all combinations at once with 'queries' "
+    "and set city and month to empty strings. ",
     arguments=[
         ToolArgument(
             name="city",
@@ -22,6 +24,20 @@ find_events_tool = ToolDefinition(
             type="string",
             description="The month to search for events (will search 1 month either side of the month provided)",
         ),
+        ToolArgument(
+            name="query",
+            type="string",
+            description="Keywords for the kind of event the user wants (e.g. 'jazz festival'); "
+            "returns only the best matches",
+            required=False,
+        ),
+        ToolArgument(
+            name="queries",
+            type="array",
+            description="List of {'city': ..., 'month': ...} searches to run together, "
+            "e.g. for several candidate cities; results are grouped per search",
+            required=False,
+        ),
     ],
 )
 
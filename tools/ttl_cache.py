@@ -0,0 +1,115 @@
+import asyncio
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from temporalio import activity
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+class TTLCache:
+    """
+    Async read-through cache with a time-to-live and optional stale-while-revalidate.
+
+    Entries are fresh for ttl_seconds. For stale_seconds after that they are still
+    served, but a background refresh is started. Concurrent misses for the same
+    key share one load. The cache is bounded to max_entries, dropping the oldest
+    first, and is safe to share across the worker's threads.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl_seconds: float,
+        stale_seconds: float = 0.0,
+        max_entries: int = 10_000,
+        cache_if: Callable[[Any], bool] = lambda value: True,
+    ) -> None:
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.cache_if = cache_if  # e.g. don't keep error responses
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._loads: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get(self, key: Hashable, loader: Loader) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            age = now - stored_at
+            if age < self.ttl_seconds:
+                self._record("hit")
+                return copy.deepcopy(value)
+            if age < self.ttl_seconds + self.stale_seconds:
+                self._record("stale")
+                self._load(key, loader)  # refresh in the background
+                return copy.deepcopy(value)
+
+        self._record("miss")
+        return copy.deepcopy(await asyncio.shield(self._load(key, loader)))
+
+    def _load(self, key: Hashable, loader: Loader) -> "asyncio.Future[Any]":
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            load = self._loads.get(key)
+            # Loads are shared by callers on the same event loop
+            if load is None or load.get_loop() is not loop:
+                load = loop.create_task(self._fetch(key, loader))
+                # Background refreshes have no awaiter; mark their errors as seen
+                load.add_done_callback(lambda f: f.cancelled() or f.exception())
+                self._loads[key] = load
+            return load
+
+    async def _fetch(self, key: Hashable, loader: Loader) -> Any:
+        try:
+            value = await loader()
+            if self.cache_if(value):
+                self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                if self._loads.get(key) is asyncio.current_task():
+                    del self._loads[key]
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _record(self, outcome: str) -> None:
+        with self._lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "stale":
+                self.stale_hits += 1
+            else:
+                self.misses += 1
+        if activity.in_activity():
+            activity.metric_meter().create_counter(
+                "agent_tool_cache_lookups", "Tool cache lookups by outcome"
+            ).add(1, {"cache": self.name, "outcome": outcome})
+
+    def hit_rate(self) -> Optional[float]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / lookups if lookups else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "entries": len(self._entries),
+        }
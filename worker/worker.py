@@ -4,10 +4,12 @@ import logging
 import os
 
 from dotenv import load_dotenv
+from temporalio.runtime import PrometheusConfig, Runtime, TelemetryConfig
 from temporalio.worker import Worker
 
 from activities.activities import AgentActivities, dynamic_tool_activity
 from shared.config import TEMPORAL_TASK_QUEUE, get_temporal_client
+from shared.tracing import setup_tracing
 from workflows.agent_goal_workflow import AgentGoalWorkflow
 
 
@@ -18,13 +20,35 @@ async def main():
     # Print LLM configuration info
     llm_model = os.environ.get("LLM_MODEL", "openai/gpt-4")
     print(f"Worker will use LLM model: {llm_model}")
+    max_concurrent_activities = int(
+        os.environ.get("WORKER_MAX_CONCURRENT_ACTIVITIES", "200")
+    )
 
-    # Create the client
-    client = await get_temporal_client()
+    # Serve Temporal's worker metrics, plus the agent's LLM metrics, for Prometheus
+    # (opt-in; each worker on a host needs its own port)
+    runtime = None
+    metrics_address = os.environ.get("WORKER_METRICS_ADDRESS", "")
+    if metrics_address:
+        runtime = Runtime(
+            telemetry=TelemetryConfig(
+                metrics=PrometheusConfig(bind_address=metrics_address)
+            )
+        )
+        print(f"Serving Prometheus metrics at http://{metrics_address}/metrics")
+
+    # Create the client; its tracing interceptors also trace workflows and activities
+    client = await get_temporal_client(runtime, setup_tracing("agent-worker"))
 
     # Initialize the activities class
     activities = AgentActivities()
     print(f"AgentActivities initialized with LLM model: {llm_model}")
+    for call_site, route in activities.llm_routes.items():
+        print(f"LLM route for {call_site}: {route.model}")
+    print(f"Max concurrent LLM calls: {activities.llm_max_concurrency}")
+    print(
+        f"HTTP pool: max {activities.http_pool.limits.max_connections} connections, "
+        f"HTTP/2 {'on' if activities.http_pool.http2 else 'off'}"
+    )
 
     print("Worker ready to process tasks!")
     logging.basicConfig(level=logging.WARN)
@@ -42,6 +66,7 @@ async def main():
                 dynamic_tool_activity,
             ],
             activity_executor=activity_executor,
+            max_concurrent_activities=max_concurrent_activities,
         )
 
         print(f"Starting worker, connecting to task queue: {TEMPORAL_TASK_QUEUE}")
@@ -4,18 +4,22 @@ from typing import Any, Deque, Dict, Optional, Union
 
 from temporalio import workflow
 from temporalio.common import RetryPolicy
+from temporalio.exceptions import ActivityError, ApplicationError
 
 from models.core import AgentGoal
 from models.requests import (
     ConversationHistory,
+    ConversationHistoryDelta,
     CurrentTool,
     EnvLookupInput,
     EnvLookupOutput,
+    Message,
     ToolData,
     ValidationInput,
 )
 from workflows import workflow_helpers as helpers
 from workflows.workflow_helpers import (
+    LLM_ACTIVITY_HEARTBEAT_TIMEOUT,
     LLM_ACTIVITY_SCHEDULE_TO_CLOSE_TIMEOUT,
     LLM_ACTIVITY_START_TO_CLOSE_TIMEOUT,
 )
@@ -23,7 +27,11 @@ from workflows.workflow_helpers import (
 with workflow.unsafe.imports_passed_through():
     from activities.activities import AgentActivities
     from models.requests import CombinedInput, ToolPromptInput
-    from prompts.agent_prompt_generators import generate_genai_prompt
+    from prompts.agent_prompt_generators import (
+        generate_genai_prompt,
+        generate_genai_prompt_context,
+    )
+    from prompts.history_window import SerializedHistory
 
 # Constants
 MAX_TURNS_BEFORE_CONTINUE = 250
@@ -35,8 +43,16 @@ class AgentGoalWorkflow:
 
     def __init__(self) -> None:
         self.conversation_history: ConversationHistory = {"messages": []}
+        # JSON of each message, kept in step with conversation_history by add_message
+        self.serialized_history = SerializedHistory()
+        self.goal_prompt: Optional[str] = None  # static prompt prefix, rendered once
         self.prompt_queue: Deque[str] = deque()
         self.chat_ended: bool = False
+        self.continuing_as_new: bool = False  # set once this run starts handing over
+        self.prompts_dequeued: int = 0  # prompts taken off prompt_queue in this run
+        # queue position of each prompt submitted by update -> history length when
+        # the prompt was dequeued (None while it is still queued)
+        self.update_reply_starts: Dict[int, Optional[int]] = {}
         self.tool_data: Optional[ToolData] = None
         self.goal: Optional[AgentGoal] = None
         self.waiting_for_confirm: bool = False
@@ -46,6 +62,12 @@ class AgentGoalWorkflow:
         self.confirmed: bool = (
             False  # indicates that we have confirmation to proceed to run tool
         )
+        self.speculative_planning: bool = (
+            False  # set from env file in activity lookup_wf_env_settings
+        )
+        self.history_token_budget: Optional[int] = (
+            None  # set from env file in activity lookup_wf_env_settings
+        )
 
     # see ../api/main.py#temporal_client.start_workflow() for how the input parameters are set
     @workflow.run
@@ -76,6 +98,7 @@ class AgentGoalWorkflow:
             # handle chat should end. When chat ends, push conversation history to workflow results.
             if self.chat_ended:
                 workflow.logger.info("Chat-end signal received. Chat ending.")
+                await workflow.wait_condition(workflow.all_handlers_finished)
                 return f"{self.conversation_history}"
 
             # Execute the tool
@@ -87,14 +110,26 @@ class AgentGoalWorkflow:
             if self.prompt_queue:
                 # get most recent prompt
                 prompt = self.prompt_queue.popleft()
+                if self.prompts_dequeued in self.update_reply_starts:
+                    # the reply to a submit_prompt update is the next agent message
+                    self.update_reply_starts[self.prompts_dequeued] = len(
+                        self.conversation_history["messages"]
+                    )
+                self.prompts_dequeued += 1
                 workflow.logger.info(
                     f"workflow step: processing message on the prompt queue, message is {prompt}"
                 )
 
+                planner: Optional[workflow.ActivityHandle[dict]] = None
+
                 # Validate user-provided prompts
                 if helpers.is_user_prompt(prompt):
                     self.add_message("user", prompt)
 
+                    # Speculatively plan while validating, since validation almost always passes
+                    if self.speculative_planning:
+                        planner = self.start_tool_planner(prompt)
+
                     # Validate the prompt before proceeding
                     validation_input = ValidationInput(
                         prompt=prompt,
@@ -116,32 +151,29 @@ class AgentGoalWorkflow:
                         workflow.logger.warning(
                             f"Prompt validation failed: {validation_result.validationFailedReason}"
                         )
+                        if planner is not None:
+                            planner.cancel()
+                            helpers.record_speculative_plan(discarded=True)
+                            # Wait for the cancellation so the run doesn't end with
+                            # the planner still scheduled
+                            try:
+                                await planner
+                            except ActivityError:
+                                pass
                         self.add_message(
                             "agent", validation_result.validationFailedReason
                         )
                         continue
 
-                # If valid, proceed with generating the context and prompt
-                context_instructions = generate_genai_prompt(
-                    agent_goal=self.goal,
-                    conversation_history=self.conversation_history,
-                    raw_json=self.tool_data,
-                )
+                    if planner is not None:
+                        helpers.record_speculative_plan(discarded=False)
 
-                prompt_input = ToolPromptInput(
-                    prompt=prompt, context_instructions=context_instructions
-                )
+                # If valid, proceed with generating the context and prompt
+                if planner is None:
+                    planner = self.start_tool_planner(prompt)
 
                 # connect to LLM and execute to get next steps
-                tool_data = await workflow.execute_activity_method(
-                    AgentActivities.agent_toolPlanner,
-                    prompt_input,
-                    schedule_to_close_timeout=LLM_ACTIVITY_SCHEDULE_TO_CLOSE_TIMEOUT,
-                    start_to_close_timeout=LLM_ACTIVITY_START_TO_CLOSE_TIMEOUT,
-                    retry_policy=RetryPolicy(
-                        initial_interval=timedelta(seconds=5), backoff_coefficient=1
-                    ),
-                )
+                tool_data = await planner
 
                 tool_data["force_confirm"] = self.show_tool_args_confirmation
                 self.tool_data = ToolData(**tool_data)
@@ -159,7 +191,7 @@ class AgentGoalWorkflow:
                     args = tool_data.get("args", {})
                     # if we're missing arguments, ask for them
                     if await helpers.handle_missing_args(
-                        current_tool, args, tool_data, self.prompt_queue
+                        current_tool, args, tool_data, self.prompt_queue, self.goal
                     ):
                         continue
 
@@ -175,11 +207,14 @@ class AgentGoalWorkflow:
 
                 # else if the next step is to be done with the conversation such as if the user requests it via asking to "end conversation"
                 elif next_step == "done":
+                    # no further prompts will be answered; pending updates fail now
+                    self.chat_ended = True
                     self.add_message("agent", tool_data)
 
                     # here we could send conversation to AI for analysis
 
-                    # end the workflow
+                    # end the workflow once any streaming clients have received the final message
+                    await workflow.wait_condition(workflow.all_handlers_finished)
                     return str(self.conversation_history)
 
                 self.add_message("agent", tool_data)
@@ -189,6 +224,7 @@ class AgentGoalWorkflow:
                     self.goal,
                     MAX_TURNS_BEFORE_CONTINUE,
                     self.add_message,
+                    self.begin_continue_as_new,
                 )
 
     # look up env settings in an activity so they're part of history
@@ -196,6 +232,8 @@ class AgentGoalWorkflow:
         env_lookup_input = EnvLookupInput(
             show_confirm_env_var_name="SHOW_CONFIRM",
             show_confirm_default=True,
+            speculative_planning_env_var_name="SPECULATIVE_PLANNING",
+            speculative_planning_default=False,
         )
         env_output: EnvLookupOutput = await workflow.execute_activity_method(
             AgentActivities.get_wf_env_vars,
@@ -206,6 +244,44 @@ class AgentGoalWorkflow:
             ),
         )
         self.show_tool_args_confirmation = env_output.show_confirm
+        self.speculative_planning = env_output.speculative_planning
+        self.history_token_budget = env_output.history_token_budget
+
+    # generate the context and prompt, then start the LLM planning activity for it
+    def start_tool_planner(self, prompt: str) -> workflow.ActivityHandle[dict]:
+        if self.goal_prompt is None:
+            self.goal_prompt = generate_genai_prompt(agent_goal=self.goal)
+        history_json, tokens_saved = self.serialized_history.render(
+            self.conversation_history, self.history_token_budget
+        )
+        if tokens_saved:
+            workflow.logger.info(
+                f"Windowed planner history, saved ~{tokens_saved} tokens"
+            )
+        dynamic_context = generate_genai_prompt_context(
+            conversation_history=history_json,
+            raw_json=self.tool_data,
+        )
+
+        prompt_input = ToolPromptInput(
+            prompt=prompt,
+            context_instructions=self.goal_prompt,
+            dynamic_context=dynamic_context,
+            tool_data_response=True,
+        )
+
+        return workflow.start_activity_method(
+            AgentActivities.agent_toolPlanner,
+            prompt_input,
+            schedule_to_close_timeout=LLM_ACTIVITY_SCHEDULE_TO_CLOSE_TIMEOUT,
+            start_to_close_timeout=LLM_ACTIVITY_START_TO_CLOSE_TIMEOUT,
+            # The planner heartbeats while it waits on the LLM, which is how a
+            # speculative run's cancellation reaches it
+            heartbeat_timeout=LLM_ACTIVITY_HEARTBEAT_TIMEOUT,
+            retry_policy=RetryPolicy(
+                initial_interval=timedelta(seconds=5), backoff_coefficient=1
+            ),
+        )
 
     # define if we're ready for tool execution
     def ready_for_tool_execution(self) -> bool:
@@ -235,6 +311,10 @@ class AgentGoalWorkflow:
 
         self.waiting_for_confirm = False
 
+    def begin_continue_as_new(self) -> None:
+        """Stop accepting prompt updates; this run will not answer them."""
+        self.continuing_as_new = True
+
     def add_message(self, actor: str, response: Union[str, Dict[str, Any]]) -> None:
         """Add a message to the conversation history.
 
@@ -248,9 +328,9 @@ class AgentGoalWorkflow:
         else:
             workflow.logger.debug(f"Adding {actor} message: {response[:100]}...")
 
-        self.conversation_history["messages"].append(
-            {"actor": actor, "response": response}
-        )
+        message: Message = {"actor": actor, "response": response}
+        self.conversation_history["messages"].append(message)
+        self.serialized_history.append(message)
 
     # Signal that comes from api/main.py via a post to /send-prompt
     @workflow.signal
@@ -262,6 +342,53 @@ class AgentGoalWorkflow:
             return
         self.prompt_queue.append(prompt)
 
+    # Update that comes from api/main.py via a post to /send-prompt-and-wait
+    @workflow.update
+    async def submit_prompt(self, prompt: str) -> Message:
+        """Update handler that queues a user prompt and returns the agent's reply."""
+        workflow.logger.info(f"update received: submit_prompt, prompt is {prompt}")
+        # The queue is FIFO, so this prompt is dequeued after everything ahead of it
+        position = self.prompts_dequeued + len(self.prompt_queue)
+        self.update_reply_starts[position] = None
+        self.prompt_queue.append(prompt)
+
+        def reply() -> Optional[Message]:
+            reply_start = self.update_reply_starts[position]
+            if reply_start is None:
+                return None
+            return next(
+                (
+                    message
+                    for message in self.conversation_history["messages"][reply_start:]
+                    if message["actor"] == "agent"
+                ),
+                None,
+            )
+
+        # Ending or continuing as new waits for all handlers, so stop waiting then
+        await workflow.wait_condition(
+            lambda: reply() is not None or self.chat_ended or self.continuing_as_new
+        )
+        message = reply()
+        del self.update_reply_starts[position]
+        if message is not None:
+            return message
+        if self.continuing_as_new:
+            # The prompt is carried over in the prompt queue and answered there
+            raise ApplicationError(
+                "Session moved to a new run before the agent replied; "
+                "the reply will appear in the conversation history."
+            )
+        raise ApplicationError("Chat ended before the agent replied.")
+
+    @submit_prompt.validator
+    def validate_submit_prompt(self, prompt: str) -> None:
+        # Rejected updates are not recorded in workflow history
+        if self.chat_ended:
+            raise ValueError("Chat has ended.")
+        if self.continuing_as_new:
+            raise ValueError("Session is moving to a new run; retry shortly.")
+
     # Signal that comes from api/main.py via a post to /confirm
     @workflow.signal
     async def confirm(self) -> None:
@@ -281,6 +408,48 @@ class AgentGoalWorkflow:
         """Query handler to retrieve the full conversation history."""
         return self.conversation_history
 
+    # Update that comes from api/main.py via /stream-conversation; it long-polls for new messages
+    @workflow.update
+    async def wait_for_messages(self, offset: int) -> int:
+        """Update handler that resolves once the history has grown past offset.
+
+        It is only a wake-up: it returns the current history length, and clients
+        read the new messages with the get_conversation_history_since query, so
+        no message payloads are written to workflow history. An offset beyond the
+        end of the history (e.g. after continue-as-new) resolves at once, and the
+        query then returns the whole history so the client can start over.
+
+        Every call is still an update, recorded in history and counted against the
+        server's per-execution update limits (by default 10 in flight and 2000 in
+        total), so many streams on one session can be rejected; the API falls back
+        to polling the query when that happens.
+        """
+        await workflow.wait_condition(
+            lambda: len(self.conversation_history["messages"]) > offset
+            or offset > len(self.conversation_history["messages"])
+            or self.chat_ended
+            # don't hold up the handover; the next poll reaches the new run
+            or self.continuing_as_new
+        )
+        return len(self.conversation_history["messages"])
+
+    def messages_since(self, offset: int) -> ConversationHistoryDelta:
+        """Return the messages after offset along with the current history length."""
+        messages = self.conversation_history["messages"]
+        if offset > len(messages):
+            offset = 0
+        return ConversationHistoryDelta(
+            messages=messages[offset:],
+            offset=offset,
+            total=len(messages),
+            chat_ended=self.chat_ended,
+        )
+
+    @workflow.query
+    def get_conversation_history_since(self, offset: int) -> ConversationHistoryDelta:
+        """Query handler to retrieve only the messages after offset, plus the current length."""
+        return self.messages_since(offset)
+
     @workflow.query
     def get_latest_tool_data(self) -> Optional[ToolData]:
         """Query handler to retrieve the latest tool data response if available."""
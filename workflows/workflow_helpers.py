@@ -7,6 +7,7 @@ from temporalio.exceptions import ActivityError
 
 with workflow.unsafe.imports_passed_through():
     from activities.activities import AgentActivities
+    from models.core import AgentGoal
     from models.requests import ConversationHistory, ToolData, ToolPromptInput
     from prompts.agent_prompt_generators import (
         generate_missing_args_prompt,
@@ -18,6 +19,7 @@ TOOL_ACTIVITY_START_TO_CLOSE_TIMEOUT = timedelta(seconds=30)
 TOOL_ACTIVITY_SCHEDULE_TO_CLOSE_TIMEOUT = timedelta(minutes=30)
 LLM_ACTIVITY_START_TO_CLOSE_TIMEOUT = timedelta(seconds=30)
 LLM_ACTIVITY_SCHEDULE_TO_CLOSE_TIMEOUT = timedelta(minutes=30)
+LLM_ACTIVITY_HEARTBEAT_TIMEOUT = timedelta(seconds=5)
 
 
 async def handle_tool_execution(
@@ -53,9 +55,16 @@ async def handle_missing_args(
     args: Dict[str, Any],
     tool_data: Dict[str, Any],
     prompt_queue: Deque[str],
+    agent_goal: AgentGoal,
 ) -> bool:
-    """Check for missing arguments and handle them if found."""
-    missing_args = [key for key, value in args.items() if value is None]
+    """Check for missing required arguments and handle them if found."""
+    tool = next((t for t in agent_goal.tools if t.name == current_tool), None)
+    optional_args = (
+        {arg.name for arg in tool.arguments if not arg.required} if tool else set()
+    )
+    missing_args = [
+        key for key, value in args.items() if value is None and key not in optional_args
+    ]
 
     if missing_args:
         prompt_queue.append(
@@ -82,7 +91,7 @@ def prompt_summary_with_history(
     context_instructions = f"Here is the conversation history between a user and a chatbot: {history_string}"
     actual_prompt = (
         "Please produce a two sentence summary of this conversation. "
-        'Put the summary in the format { "summary": "<plain text>" }'
+        'Respond with only a JSON object in the format { "summary": "<plain text>" }'
     )
     return (context_instructions, actual_prompt)
 
@@ -93,22 +102,35 @@ async def continue_as_new_if_needed(
     agent_goal: Any,
     max_turns: int,
     add_message_callback: Callable[..., Any],
+    begin_continue_callback: Callable[[], None],
 ) -> None:
-    """Handle workflow continuation if message limit is reached."""
-    if len(conversation_history["messages"]) >= max_turns:
+    """Handle workflow continuation if message limit is reached, or if the server
+    suggests it (e.g. stream long-polls have filled the history with updates)."""
+    if (
+        len(conversation_history["messages"]) >= max_turns
+        or workflow.info().is_continue_as_new_suggested()
+    ):
+        # from here on, updates that need this run to reply would never finish
+        begin_continue_callback()
         summary_context, summary_prompt = prompt_summary_with_history(
             conversation_history
         )
         summary_input = ToolPromptInput(
-            prompt=summary_prompt, context_instructions=summary_context
+            prompt=summary_prompt,
+            context_instructions=summary_context,
+            call_site="summarize",
         )
         conversation_summary = await workflow.start_activity_method(
             AgentActivities.agent_toolPlanner,
             summary_input,
             schedule_to_close_timeout=LLM_ACTIVITY_SCHEDULE_TO_CLOSE_TIMEOUT,
         )
-        workflow.logger.info(f"Continuing as new after {max_turns} turns.")
+        workflow.logger.info(
+            f"Continuing as new after {len(conversation_history['messages'])} turns."
+        )
         add_message_callback("conversation_summary", conversation_summary)
+        # let streaming clients receive the summary before this run ends
+        await workflow.wait_condition(workflow.all_handlers_finished)
         workflow.continue_as_new(
             args=[
                 {
@@ -122,6 +144,14 @@ async def continue_as_new_if_needed(
         )
 
 
+def record_speculative_plan(discarded: bool) -> None:
+    """Count speculative planner runs; the discarded share is the wasted-call rate."""
+    workflow.metric_meter().create_counter(
+        "agent_speculative_plans",
+        "Tool planner calls started alongside prompt validation",
+    ).add(1, {"outcome": "discarded" if discarded else "used"})
+
+
 # LLM-tagged prompts start with "###"
 # all others are from the user
 def is_user_prompt(prompt) -> bool: